@@ -0,0 +1,152 @@
+"""
+Model yakınlığına göre görev zamanlayıcı (agent_auto.py için).
+
+Tek GPU'lu bir Ollama host'unda görevleri dosya sırasıyla işlemek modeller arasında
+sürekli geçişe (her biri birkaç saniyelik yükleme) yol açar. Bu zamanlayıcı bekleyen
+görevlerden, en son gönderilen modelle aynı modeli hedefleyeni öne alır:
+- window: kuyruğun başından en fazla kaç görev ileriye bakılır (1 = sıralama yok)
+- max_bypass: bir görevin önüne en fazla kaç kez başka görev geçebilir (açlık sınırı)
+ThreadPoolExecutor gibi submit() Future döner ve shutdown(wait, cancel_futures) destekler.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from itertools import islice
+
+logger = logging.getLogger("agent_auto")
+
+
+class _Item:
+    __slots__ = ("model", "future", "fn", "args", "kwargs", "bypassed")
+
+    def __init__(self, model, future, fn, args, kwargs):
+        self.model = model
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.bypassed = 0
+
+
+class AffinityScheduler:
+    def __init__(self, max_workers: int, window: int = 8, max_bypass: int = 4,
+                 thread_name_prefix: str = "affinity_worker"):
+        self.window = max(1, window)
+        self.max_bypass = max(0, max_bypass)
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._active = 0
+        # en son gönderilen model: host'ta büyük olasılıkla yüklü olan
+        self._current = None
+        self.dispatched = 0
+        self.swaps = 0
+        self.reordered = 0
+        self.by_model = {}
+        self._batch_started = None
+        self._batch_swaps = 0
+        self._batch_dispatched = 0
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"{thread_name_prefix}_{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, model: str | None, fn, *args, **kwargs) -> Future:
+        future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._pending.append(_Item(model, future, fn, args, kwargs))
+            if self._batch_started is None:
+                self._batch_started = time.monotonic()
+            self._cond.notify()
+        return future
+
+    def _pick(self) -> _Item:
+        """Pencere içinde mevcut modeli hedefleyen ilk görev; önündekiler açlık sınırındaysa baştaki."""
+        index = 0
+        if self._current is not None and self._pending[0].model != self._current:
+            for i, item in enumerate(islice(self._pending, self.window)):
+                if item.model == self._current:
+                    if all(p.bypassed < self.max_bypass for p in islice(self._pending, i)):
+                        index = i
+                    break
+        if index:
+            for p in islice(self._pending, index):
+                p.bypassed += 1
+            self.reordered += 1
+        item = self._pending[index]
+        del self._pending[index]
+        return item
+
+    def _take(self) -> _Item | None:
+        with self._cond:
+            while not self._pending and not self._shutdown:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            item = self._pick()
+            if item.model is not None:
+                if self._current is not None and item.model != self._current:
+                    self.swaps += 1
+                    self._batch_swaps += 1
+                self._current = item.model
+                self.by_model[item.model] = self.by_model.get(item.model, 0) + 1
+            self.dispatched += 1
+            self._batch_dispatched += 1
+            self._active += 1
+            return item
+
+    def _finish_one(self):
+        with self._cond:
+            self._active -= 1
+            if self._pending or self._active or self._batch_started is None:
+                return
+            elapsed = time.monotonic() - self._batch_started
+            logger.info(
+                f"📊 Kuyruk boşaldı: {self._batch_dispatched} görev, {self._batch_swaps} model değişimi, "
+                f"{elapsed:.1f}s (toplam {self.swaps} değişim / {self.dispatched} görev)"
+            )
+            self._batch_started = None
+            self._batch_swaps = 0
+            self._batch_dispatched = 0
+
+    def _worker(self):
+        while True:
+            item = self._take()
+            if item is None:
+                return
+            try:
+                if item.future.set_running_or_notify_cancel():
+                    try:
+                        item.future.set_result(item.fn(*item.args, **item.kwargs))
+                    except BaseException as e:
+                        item.future.set_exception(e)
+            finally:
+                self._finish_one()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "dispatched": self.dispatched,
+                "swaps": self.swaps,
+                "reordered": self.reordered,
+                "by_model": dict(self.by_model),
+                "pending": len(self._pending),
+            }
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        with self._cond:
+            self._shutdown = True
+            if cancel_futures:
+                while self._pending:
+                    self._pending.popleft().future.cancel()
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
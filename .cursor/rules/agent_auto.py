@@ -7,11 +7,19 @@ from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 from datetime import datetime
 from pathlib import Path
-import requests
 import json
 import tempfile
 import re
 import signal
+from ollama_client import get_client, iter_stream_chunks
+from llm_cache import get_cache
+from model_warmup import ModelWarmer
+from affinity_scheduler import AffinityScheduler
+from generated_store import GeneratedLineStore
+from tasks_ingest import IncrementalLineReader
+from event_pipeline import EventCoalescer
+from section_parser import SectionParser, parse_sections
+from circuit_breaker import call_with_fallbacks, ModelNotFoundError, ModelsUnavailableError
 
 # graceful shutdown event used by signal handler
 stop_event = threading.Event()
@@ -28,7 +36,23 @@ OLLAMA_API = os.environ.get("OLLAMA_API", "http://localhost:11434/api/generate")
 
 RETRY_ATTEMPTS = int(os.environ.get("AGENT_AUTO_RETRY", "3"))
 REQUEST_TIMEOUT = int(os.environ.get("AGENT_AUTO_TIMEOUT", "30"))
+# aynı yola gelen olaylar bu süre sessizlik olana kadar birleştirilir (yol başına)
 DEBOUNCE_SECONDS = float(os.environ.get("AGENT_AUTO_DEBOUNCE", "0.5"))
+# ajanın kendi yazdığı yerler izlenmez (virgülle ayrılmış glob'lar, WATCH_DIR'e göre)
+IGNORE_GLOBS = os.environ.get(
+    "AGENT_AUTO_IGNORE",
+    "logs/*,outputs/*,prompts/*,schemas/*,lib/*,processed_tasks/*,.git/*,*/__pycache__/*,*.tmp,*.swp,*~",
+).split(",")
+# aynı anda uçuşta olabilecek model çağrısı sayısı
+WORKER_COUNT = max(1, int(os.environ.get("AGENT_AUTO_WORKERS", "4")))
+# model değişimini azaltmak için kuyrukta en fazla kaç görev ileriye bakılır (1 = dosya sırası)
+AFFINITY_WINDOW = int(os.environ.get("AGENT_AUTO_AFFINITY_WINDOW", "8"))
+# bir görevin önüne en fazla kaç başka-model görevi geçebilir
+AFFINITY_MAX_BYPASS = int(os.environ.get("AGENT_AUTO_AFFINITY_MAX_BYPASS", "4"))
+# router'ın seçebileceği modeller (fallback sırası)
+ROUTER_MODELS = ("llama3:latest", "mistral:latest", "deepseek-coder:latest")
+# 1 ise model çıktısı NDJSON akışı olarak okunur ve bölümler kapandıkça diske yazılır
+STREAM_MODE = os.environ.get("AGENT_AUTO_STREAM", "0") == "1"
 
 # Klasörleri oluştur (güvenli)
 for d in (TASKS_DIR, PROCESSED_DIR, "lib/components", "prompts", "schemas", LOG_DIR, OUTPUT_FALLBACK):
@@ -51,29 +75,29 @@ ch = logging.StreamHandler()
 ch.setFormatter(logging.Formatter("%(message)s"))
 logger.addHandler(ch)
 
-# --- Durum cache (aynı tasks.txt içeriğini tekrar işlememek için) ---
-last_tasks_hash = None
+# --- tasks.txt artımlı okuma: yalnızca eklenen/değişen satırlar işlenir ---
+line_readers = {}
+ingest_lock = threading.Lock()
 
-# --- Sprint satırları için üretilen görevlerin tekrarını önlemek için cache ---
+# --- Sprint satırları için üretilen görevlerin tekrarını önlemek için indeks ---
+# eski JSON cache ilk çalıştırmada SQLite indeksine aktarılır
 GENERATED_CACHE = os.path.join(LOG_DIR, "generated_lines.json")
+GENERATED_DB = os.path.join(LOG_DIR, "generated_lines.db")
 
-# In-memory set for generated lines, initialized at module load time
-generated_lines = set()
+# one INSERT per new line; shared safely with other agent_auto processes
+line_store = GeneratedLineStore(GENERATED_DB)
 
-# in-flight processing set to avoid double-handling
+# in-flight processing set to avoid double-handling; acts as the pool's dedup guard
 processing_lock = threading.Lock()
 currently_processing = set()
 
-# load / persist which sprint lines have already produced tasks (avoid duplicates)
-def load_generated_lines():
-    try:
-        if os.path.exists(GENERATED_CACHE):
-            with open(GENERATED_CACHE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return set(data if isinstance(data, list) else [])
-    except Exception as e:
-        logger.warning(f"Generated lines cache load failed: {e}")
-    return set()
+# router modellerini bellekte tutar; health_check_models ısındırır, ana döngü yeniler
+model_warmer = ModelWarmer(OLLAMA_API, ROUTER_MODELS)
+
+# bounded worker pool: generate_tasks and WatchHandler only submit, workers call the model;
+# pending tasks are reordered by target model to avoid swapping models on the host
+task_pool = AffinityScheduler(WORKER_COUNT, window=AFFINITY_WINDOW, max_bypass=AFFINITY_MAX_BYPASS,
+                              thread_name_prefix="agent_auto_worker")
 
 def atomic_write(path: str, data: str):
     dirpath = os.path.dirname(path)
@@ -90,12 +114,6 @@ def atomic_write(path: str, data: str):
             pass
         raise
 
-def save_generated_lines(s):
-    try:
-        atomic_write(GENERATED_CACHE, json.dumps(list(s), indent=2, ensure_ascii=False))
-    except Exception as e:
-        logger.warning(f"Generated lines cache save failed: {e}")
-
 # === YARDIMCILAR ===
 
 def make_safe_filename(s: str) -> str:
@@ -136,50 +154,181 @@ def make_task_filename(line: str, idx: int, timestamp: str) -> str:
 
 # === MODEL ÇAĞRI ===
 
-def query_model(endpoint: str, prompt: str, preferred_model: str | None = None) -> tuple[str, str]:
-    session = requests.Session()
+def query_model(endpoint: str, prompt: str, preferred_model: str | None = None, stream_to=None,
+                bypass_cache: bool = False) -> tuple[str, str]:
+    """stream_to verilirse (feed/reset arayüzü) yanıt akış olarak okunur ve parça parça iletilir."""
+    client = get_client()
+    cache = get_cache()
     # Build candidate model list: preferred first if given, otherwise choose based on prompt.
     if preferred_model:
-        candidates = [preferred_model] + [m for m in ("llama3:latest", "mistral:latest", "deepseek-coder:latest") if m != preferred_model]
+        candidates = [preferred_model] + [m for m in ROUTER_MODELS if m != preferred_model]
     else:
         pref = choose_model_name(prompt)
-        candidates = [pref] + [m for m in ("llama3:latest", "mistral:latest", "deepseek-coder:latest") if m != pref]
-    last_err = None
-    for model in candidates:
-        for attempt in range(1, RETRY_ATTEMPTS + 1):
-            payload = {"prompt": prompt, "stream": False, "model": model}
-            try:
-                logger.info(f"Model çağrısı: {model} (deneme {attempt})")
-                r = session.post(endpoint, json=payload, timeout=REQUEST_TIMEOUT)
-                if r.status_code in (400, 404):
-                    try:
-                        err_json = r.json()
-                        err_msg = str(err_json.get("error", "")).lower()
-                        if "model" in err_msg and "not found" in err_msg:
-                            logger.warning(f"Model '{model}' bulunamadı, sonraki modele geçilecek.")
-                            break  # break out of retry loop to try next model
-                    except ValueError:
-                        pass
-                r.raise_for_status()
+        candidates = [pref] + [m for m in ROUTER_MODELS if m != pref]
+
+    def call(model: str) -> str:
+        cached = cache.get(model, prompt, bypass=bypass_cache)
+        if cached is not None:
+            logger.info(f"💾 Cache'ten yanıt: {model}")
+            if stream_to is not None:
+                stream_to.reset()
+                stream_to.feed(cached)
+            return cached
+        payload = {"prompt": prompt, "stream": stream_to is not None, "model": model,
+                   "keep_alive": model_warmer.keep_alive_for(model)}
+        logger.info(f"Model çağrısı: {model}")
+        r = client.post(endpoint, payload, timeout=REQUEST_TIMEOUT, stream=stream_to is not None)
+        try:
+            if r.status_code in (400, 404):
+                try:
+                    err_msg = str(r.json().get("error", "")).lower()
+                except ValueError:
+                    err_msg = ""
+                if "model" in err_msg and "not found" in err_msg:
+                    raise ModelNotFoundError(err_msg)
+            r.raise_for_status()
+            if stream_to is not None:
+                # önceki başarısız denemenin yarım bölümleri atılır
+                stream_to.reset()
+                parts = []
+                for chunk in iter_stream_chunks(r):
+                    parts.append(chunk)
+                    stream_to.feed(chunk)
+                resp = "".join(parts)
+            else:
                 resp = r.json().get("response", "")
-                if not resp:
-                    logger.warning(f"Model '{model}' döndü ama response boş.")
-                return resp, model
-            except Exception as e:
-                last_err = e
-                wait = 2 ** (attempt - 1)
-                logger.warning(f"Model çağrısı hatası ({attempt}/{RETRY_ATTEMPTS}) model='{model}': {e}. {wait}s sonra denenecek.")
-                time.sleep(wait)
-    logger.error(f"Tüm model çağrıları başarısız oldu: {last_err}")
-    # fallback to preferred/or last candidate in logs
-    fallback_model = preferred_model or candidates[0]
-    return f"❌ Model hatası (tüm denemeler başarısız): {last_err}", fallback_model
+        finally:
+            # akış yarıda kesilse bile bağlantı havuza geri verilir
+            if stream_to is not None:
+                r.close()
+        model_warmer.touch(model)
+        if not resp:
+            logger.warning(f"Model '{model}' döndü ama response boş.")
+        else:
+            try:
+                cache.put(model, prompt, resp, bypass=bypass_cache)
+            except OSError as e:
+                # yanıt alındı; cache yazma hatası model hatası sayılıp devre kesiciye yansımaz
+                logger.warning(f"⚠️ Cache'e yazılamadı ({model}): {e}")
+        return resp
+
+    try:
+        return call_with_fallbacks(endpoint, candidates, call, attempts=RETRY_ATTEMPTS, log=logger)
+    except ModelsUnavailableError as e:
+        logger.error(str(e))
+        # fallback to preferred/or last candidate in logs
+        fallback_model = preferred_model or candidates[0]
+        return f"❌ Model hatası (tüm denemeler başarısız): {e.last_error or e}", fallback_model
 
 # === PARSE & EXPORT ===
 
-def parse_and_export(text: str, task_filename: str):
+def _export_widget(code: str, base: str) -> bool:
+    """code: çitleri Section.code() ile temizlenmiş widget kodu."""
+    dst = os.path.join("lib", "components", f"{base}.dart")
+    try:
+        with open(dst, "w", encoding="utf-8") as f:
+            f.write(code + "\n")
+        logger.info(f"✅ Flutter bileşeni: {dst}")
+        return True
+    except Exception as e:
+        logger.error(f"Flutter bileşeni yazılamadı: {e}")
+        return False
+
+def _export_schema(schema_json: str, base: str) -> bool:
+    schema_json = schema_json.strip()
+    try:
+        parsed = json.loads(schema_json)
+        pretty = json.dumps(parsed, indent=2, ensure_ascii=False)
+    except Exception:
+        pretty = schema_json
+    dst = os.path.join("schemas", f"{base}.json")
+    try:
+        with open(dst, "w", encoding="utf-8") as f:
+            f.write(pretty + "\n")
+        logger.info(f"🔥 Schema: {dst}")
+        return True
+    except Exception as e:
+        logger.error(f"Schema yazılamadı: {e}")
+        return False
+
+def _export_prompt(prompt_text: str, base: str) -> bool:
+    dst = os.path.join("prompts", f"{base}.txt")
+    try:
+        with open(dst, "w", encoding="utf-8") as f:
+            f.write(prompt_text.strip() + "\n")
+        logger.info(f"🧠 Prompt: {dst}")
+        return True
+    except Exception as e:
+        logger.error(f"Prompt yazılamadı: {e}")
+        return False
+
+# bölüm türü (section_parser) -> yazıcı
+SECTION_EXPORTERS = {
+    "widget": _export_widget,
+    "schema": _export_schema,
+    "prompt": _export_prompt,
+}
+
+def _export_section(section, base: str) -> bool:
+    exporter = SECTION_EXPORTERS.get(section.kind)
+    if exporter is None:
+        return False
+    if section.kind == "schema":
+        # şema yalnızca {...} gövdesiyse alınır
+        body = section.schema_json()
+        return body is not None and exporter(body, base)
+    if section.kind == "widget":
+        return exporter(section.code(), base)
+    return exporter(section.body, base)
+
+class StreamingSectionExporter:
+    """Akıştan gelen ### Bölüm ### bloklarını, bir sonraki ### görülünce (kapandığında) hemen diske yazar."""
+
+    def __init__(self, task_filename: str):
+        self.base = Path(task_filename).stem
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.first_artifact_at = None
+        self.reset()
+
+    def reset(self):
+        self.parser = SectionParser()
+        self.exported = set()
+
+    def feed(self, chunk: str):
+        if self.first_token_at is None and chunk:
+            self.first_token_at = time.monotonic()
+            logger.info(f"⏱️ İlk token ({self.base}): {self.first_token_at - self.started:.2f}s")
+        for section in self.parser.feed(chunk):
+            self._close_section(section)
+
+    def finish(self):
+        # akış bitti: açık kalan bölüm metin sonuyla kapanır
+        for section in self.parser.finish():
+            self._close_section(section)
+        if self.first_token_at is not None:
+            ttft = f"{self.first_token_at - self.started:.2f}s"
+        else:
+            ttft = "-"
+        if self.first_artifact_at is not None:
+            first_artifact = f"{self.first_artifact_at - self.started:.2f}s"
+        else:
+            first_artifact = "-"
+        logger.info(f"⏱️ {self.base}: ilk token={ttft}, ilk artifact={first_artifact}")
+
+    def _close_section(self, section):
+        # parse_and_export ile aynı kural: her türün ilk bölümü
+        if section.kind in self.exported:
+            return
+        if _export_section(section, self.base):
+            self.exported.add(section.kind)
+            if self.first_artifact_at is None:
+                self.first_artifact_at = time.monotonic()
+
+def parse_and_export(text: str, task_filename: str, already_exported=frozenset()):
+    """already_exported: akış sırasında zaten yazılmış bölüm türleri (tekrar yazılmaz)."""
     base = Path(task_filename).stem
-    exported_any = False
+    exported_any = bool(already_exported)
 
     try:
         with open(os.path.join(LOG_DIR, f"{base}_response.txt"), "w", encoding="utf-8") as f:
@@ -187,51 +336,15 @@ def parse_and_export(text: str, task_filename: str):
     except Exception as e:
         logger.warning(f"Response log yazılamadı: {e}")
 
-    # Flutter bileşeni
-    flutter_match = re.search(r"### Flutter Widget ###\s*(.*?)\s*(?=###|$)", text, re.DOTALL)
-    if flutter_match:
-        code = flutter_match.group(1).strip()
-        code = re.sub(r"^```(?:dart)?\n?", "", code)
-        code = re.sub(r"```$", "", code)
-        dst = os.path.join("lib", "components", f"{base}.dart")
-        try:
-            with open(dst, "w", encoding="utf-8") as f:
-                f.write(code + "\n")
-            logger.info(f"✅ Flutter bileşeni: {dst}")
-            exported_any = True
-        except Exception as e:
-            logger.error(f"Flutter bileşeni yazılamadı: {e}")
-
-    # Firestore schema (JSON)
-    schema_match = re.search(r"### Firestore Schema ###\s*(\{.*?\})\s*(?=###|$)", text, re.DOTALL)
-    if schema_match:
-        schema_json = schema_match.group(1).strip()
-        try:
-            parsed = json.loads(schema_json)
-            pretty = json.dumps(parsed, indent=2, ensure_ascii=False)
-        except Exception:
-            pretty = schema_json
-        dst = os.path.join("schemas", f"{base}.json")
-        try:
-            with open(dst, "w", encoding="utf-8") as f:
-                f.write(pretty + "\n")
-            logger.info(f"🔥 Schema: {dst}")
+    # Flutter bileşeni, Firestore schema (JSON), Prompt bölümü: tek geçişte ayrıştırılır
+    # her türün ilk geçerli bölümü yazılır
+    done = set(already_exported)
+    for section in parse_sections(text):
+        if section.kind in done:
+            continue
+        if _export_section(section, base):
+            done.add(section.kind)
             exported_any = True
-        except Exception as e:
-            logger.error(f"Schema yazılamadı: {e}")
-
-    # Prompt bölümü
-    prompt_match = re.search(r"### Prompt 📋 ###\s*(.*?)\s*(?=###|$)", text, re.DOTALL)
-    if prompt_match:
-        prompt_text = prompt_match.group(1).strip()
-        dst = os.path.join("prompts", f"{base}.txt")
-        try:
-            with open(dst, "w", encoding="utf-8") as f:
-                f.write(prompt_text + "\n")
-            logger.info(f"🧠 Prompt: {dst}")
-            exported_any = True
-        except Exception as e:
-            logger.error(f"Prompt yazılamadı: {e}")
 
     # fallback
     if not exported_any:
@@ -275,62 +388,100 @@ def parse_and_export(text: str, task_filename: str):
 # === GÖREV İŞLE ===
 
 def process_task(file_path: str):
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            prompt = f.read()
+    except Exception as e:
+        logger.error(f"Görev oku hatası ({file_path}): {e}")
+        return
+    model_name = choose_model_name(prompt)
+    logger.info(f"🔄 İşleniyor: {file_path} → {model_name}")
+    if STREAM_MODE:
+        streamer = StreamingSectionExporter(file_path)
+        result, used_model = query_model(OLLAMA_API, prompt, preferred_model=model_name, stream_to=streamer)
+        streamer.finish()
+        logger.info(f"✅ Model kullanıldı: {used_model}")
+        parse_and_export(result, file_path, already_exported=streamer.exported)
+    else:
+        result, used_model = query_model(OLLAMA_API, prompt, preferred_model=model_name)
+        logger.info(f"✅ Model kullanıldı: {used_model}")
+        parse_and_export(result, file_path)
+    dst = os.path.join(PROCESSED_DIR, Path(file_path).name)
+    try:
+        os.replace(file_path, dst)
+    except FileNotFoundError:
+        logger.warning(f"Görev dosyası taşınamadı, bulunamadı: {file_path}")
+    except Exception as e:
+        logger.error(f"Görev taşınırken hata: {e}")
+
+def _release_task(file_path: str, future):
+    with processing_lock:
+        currently_processing.discard(file_path)
+    if future.cancelled():
+        logger.info(f"⏹️ Görev iptal edildi: {file_path}")
+        return
+    exc = future.exception()
+    if exc is not None:
+        logger.error(f"Görev işlenirken beklenmeyen hata ({file_path}): {exc}")
+
+def _task_model(file_path: str) -> str | None:
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            return choose_model_name(f.read())
+    except OSError:
+        # okunamayan görev sıralamaya katılmaz; hata process_task'ta loglanır
+        return None
+
+def submit_task(file_path: str, model: str | None = None):
+    """Görevi worker havuzuna gönderir; aynı dosya zaten kuyruktaysa/işleniyorsa None döner."""
     with processing_lock:
         if file_path in currently_processing:
             logger.info(f"Zaten işleniyor, atlanıyor: {file_path}")
-            return
+            return None
         currently_processing.add(file_path)
     try:
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                prompt = f.read()
-        except Exception as e:
-            logger.error(f"Görev oku hatası ({file_path}): {e}")
-            return
-        model_name = choose_model_name(prompt)
-        logger.info(f"🔄 İşleniyor: {file_path} → {model_name}")
-        result, used_model = query_model(OLLAMA_API, prompt, preferred_model=model_name)
-        logger.info(f"✅ Model kullanıldı: {used_model}")
-        parse_and_export(result, file_path)
-        dst = os.path.join(PROCESSED_DIR, Path(file_path).name)
-        try:
-            os.replace(file_path, dst)
-        except FileNotFoundError:
-            logger.warning(f"Görev dosyası taşınamadı, bulunamadı: {file_path}")
-        except Exception as e:
-            logger.error(f"Görev taşınırken hata: {e}")
-    finally:
+        future = task_pool.submit(model or _task_model(file_path), process_task, file_path)
+    except RuntimeError as e:
+        # havuz kapatıldıysa (shutdown) yeni görev kabul edilmez
         with processing_lock:
             currently_processing.discard(file_path)
+        logger.warning(f"Görev kuyruğa alınamadı ({file_path}): {e}")
+        return None
+    future.add_done_callback(lambda f: _release_task(file_path, f))
+    return future
+
+def _mark_line_generated(key: str, future):
+    # iptal edilen görevin satırı bırakılır; yeniden başlatmada tekrar üretilir
+    if future.cancelled():
+        line_store.release(key)
+    else:
+        line_store.mark_done(key)
 
 # === GÖREV ÜRETİCİ ===
 
-def generate_tasks(filepath: str):
-    global last_tasks_hash
-    global generated_lines
+def generate_tasks(filepath: str, final: bool = False):
+    """final=True: sonlandırılmamış son satır da görev olur (başlangıç taraması)."""
     if not (filepath.endswith(".txt") or filepath.endswith(".md")):
         return
-    try:
-        with open(filepath, "r", encoding="utf-8") as f:
-            text = f.read()
-    except Exception as e:
-        logger.error(f"Dosya okunamadı ({filepath}): {e}")
-        return
-    current_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
-    if os.path.basename(filepath) == WATCH_FILE:
-        if current_hash == last_tasks_hash:
+    key = os.path.abspath(filepath)
+    # aynı dosya için iki olay aynı anda okunursa offset karışmasın
+    with ingest_lock:
+        reader = line_readers.get(key)
+        if reader is None:
+            reader = line_readers[key] = IncrementalLineReader(key)
+        try:
+            new_lines = reader.read_new(final=final)
+        except Exception as e:
+            logger.error(f"Dosya okunamadı ({filepath}): {e}")
             return
-        last_tasks_hash = current_hash
-    if "sprint" not in text.lower():
-        return
-    lines = text.splitlines()
-    idx = 1
-    for line in lines:
+    if reader.last_mode == "rescan" and reader.rescans > 1:
+        logger.info(f"🔁 {os.path.basename(filepath)} baştan tarandı (kısaltma/değiştirme algılandı)")
+    for idx, line in new_lines:
         if line.strip().lower().startswith("sprint"):
             key = hashlib.sha256(line.strip().lower().encode("utf-8")).hexdigest()
-            if key in generated_lines:
+            # satır hemen sahiplenilir ki sonraki kayıtta (veya başka süreçte) tekrar kuyruğa girmesin
+            if not line_store.claim(key, line.strip()):
                 logger.info(f"✔️ Zaten işlenmiş satır, atlanıyor: {line.strip()}")
-                idx += 1
                 continue
             timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
             name = make_task_filename(line, idx, timestamp)
@@ -339,63 +490,66 @@ def generate_tasks(filepath: str):
             try:
                 atomic_write(dst, content)
                 logger.info(f"✅ Görev oluşturuldu: {dst}")
-                process_task(dst)
-                generated_lines.add(key)
-                save_generated_lines(generated_lines)
+                future = submit_task(dst, choose_model_name(content))
+                if future is None:
+                    line_store.release(key)
+                else:
+                    # görev bittiğinde done olarak işaretlenir
+                    future.add_done_callback(lambda f, key=key: _mark_line_generated(key, f))
             except Exception as e:
+                line_store.release(key)
                 logger.error(f"Görev oluşturulurken hata: {e}")
-            idx += 1
 
 # === WATCHHANDLER ===
+def _is_task_file(path: str) -> bool:
+    return path.endswith('.md') and os.path.basename(os.path.dirname(path)) == TASKS_DIR
+
+def handle_event_batch(paths: list[str]):
+    """Birleştirilmiş olay partisi: tasks.txt'ler okunur, görev dosyaları tek seferde kuyruğa verilir."""
+    for path in paths:
+        if os.path.basename(path) == WATCH_FILE:
+            logger.info(f"📝 {WATCH_FILE} değişti, görevler güncelleniyor...")
+            generate_tasks(path)
+    task_files = [p for p in paths if _is_task_file(p) and os.path.exists(p)]
+    for path in task_files:
+        logger.info(f"🆕 Yeni görev dosyası algılandı: {path}")
+        submit_task(path)
+
 class WatchHandler(FileSystemEventHandler):
-    def __init__(self):
+    def __init__(self, coalescer: EventCoalescer):
         super().__init__()
-        self._last_event_time = 0.0
+        self.coalescer = coalescer
+
+    def _relevant(self, path: str) -> bool:
+        return os.path.basename(path) == WATCH_FILE or _is_task_file(path)
 
     def on_modified(self, event):
-        if event.is_directory:
-            return
-        now = time.time()
-        if now - self._last_event_time < DEBOUNCE_SECONDS:
-            return
-        self._last_event_time = now
-        if os.path.basename(event.src_path) == WATCH_FILE:
-            logger.info(f"📝 {WATCH_FILE} değişti, görevler güncelleniyor...")
-            generate_tasks(event.src_path)
-        elif event.src_path.endswith('.md') and os.path.basename(os.path.dirname(event.src_path)) == TASKS_DIR:
-            logger.info(f"🆕 Yeni görev dosyası algılandı: {event.src_path}")
-            process_task(event.src_path)
+        if not event.is_directory and self._relevant(event.src_path):
+            self.coalescer.push(event.src_path)
 
     def on_created(self, event):
-        if event.is_directory:
-            return
-        if os.path.basename(event.src_path) == WATCH_FILE:
-            logger.info(f"📝 {WATCH_FILE} oluşturuldu, görevler üretilecek...")
-            generate_tasks(event.src_path)
-        elif event.src_path.endswith('.md') and os.path.basename(os.path.dirname(event.src_path)) == TASKS_DIR:
-            logger.info(f"🆕 Yeni görev dosyası algılandı: {event.src_path}")
-            process_task(event.src_path)
+        if not event.is_directory and self._relevant(event.src_path):
+            self.coalescer.push(event.src_path)
+
+    def on_moved(self, event):
+        # editörler tasks.txt'yi geçici dosya + rename ile kaydeder; görev dosyalarını
+        # ise atomic_write ile kendimiz taşıdığımız için yalnızca WATCH_FILE dikkate alınır
+        if not event.is_directory and os.path.basename(event.dest_path) == WATCH_FILE:
+            self.coalescer.push(event.dest_path)
 
 # === SAĞLIK KONTROLÜ ===
 
 def health_check_models(endpoint: str) -> bool:
-    success = False
-    for model in ("llama3:latest", "mistral:latest", "deepseek-coder:latest"):
-        try:
-            logger.info(f"Health check: {model}")
-            payload = {"prompt": "ping", "stream": False, "model": model}
-            r = requests.post(endpoint, json=payload, timeout=5)
-            if r.ok:
-                logger.info(f"{model} yanıt verdi (status {r.status_code})")
-                success = True
-                break
-            else:
-                logger.warning(f"{model} sağlık kontrolü başarısız: status {r.status_code}")
-        except Exception as e:
-            logger.warning(f"{model} sağlık kontrolü sırasında hata: {e}")
-    if not success:
+    """Router'ın seçebileceği tüm modelleri belleğe yükler; en az biri yüklendiyse True."""
+    logger.info(f"Health check / ısındırma: {', '.join(model_warmer.models)}")
+    warmed = model_warmer.warm_all()
+    if not warmed:
         logger.error("Hiçbir Ollama modeli yanıt vermedi.")
-    return success
+        return False
+    cold = [m for m in model_warmer.models if m not in warmed]
+    if cold:
+        logger.warning(f"Isındırılamayan modeller: {', '.join(cold)}")
+    return True
 
 # === SIGNAL HANDLER SETUP ===
 def setup_signal_handlers(observer):
@@ -408,14 +562,23 @@ def setup_signal_handlers(observer):
 
 # === ANA DÖNGÜ ===
 if __name__ == "__main__":
-    generated_lines = load_generated_lines()
+    try:
+        migrated = line_store.import_json(GENERATED_CACHE)
+        if migrated:
+            logger.info(f"📦 {migrated} işlenmiş satır {GENERATED_DB} indeksine aktarıldı.")
+    except Exception as e:
+        logger.warning(f"Generated lines cache import failed: {e}")
     # health check
     if not health_check_models(OLLAMA_API):
         logger.warning("Ollama modellerine bağlanılamıyor; görevler model döndürmeyebilir.")
+    # süre dolmadan yenile, atılan modelleri tekrar yükle
+    model_warmer.start()
     if os.path.exists(tasks_path):
-        generate_tasks(tasks_path)
+        # başlangıçta dosya kaydedilmiş haliyle okunur; yarım son satır beklenmez
+        generate_tasks(tasks_path, final=True)
+    coalescer = EventCoalescer(handle_event_batch, WATCH_DIR, delay=DEBOUNCE_SECONDS, ignore=IGNORE_GLOBS).start()
     observer = Observer()
-    handler = WatchHandler()
+    handler = WatchHandler(coalescer)
     observer.schedule(handler, WATCH_DIR, recursive=True)
     observer.start()
     setup_signal_handlers(observer)
@@ -425,4 +588,11 @@ if __name__ == "__main__":
         logger.info("🛑 Durduruluyor...")
         observer.stop()
         observer.join()
-        logger.info("✅ İzleyici kapatıldı.")
\ No newline at end of file
+        coalescer.stop()
+        logger.info("✅ İzleyici kapatıldı.")
+        # uçuştaki görevler tamamlanır, kuyrukta bekleyenler iptal edilir
+        task_pool.shutdown(wait=True, cancel_futures=True)
+        stats = task_pool.stats()
+        logger.info(f"✅ Worker havuzu kapatıldı. ({stats['dispatched']} görev, {stats['swaps']} model değişimi, {stats['reordered']} yeniden sıralama)")
+        model_warmer.stop()
+        line_store.close()
\ No newline at end of file
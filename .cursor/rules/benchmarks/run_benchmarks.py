@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Uçtan uca throughput benchmark'ları (stub Ollama ile, offline).
+
+Her giriş noktası (agent_auto, goose_sprint_bridge, queue_runner, session_summary)
+geçici bir çalışma dizininde ayrı bir süreçte sürülür; sahte /api/generate sunucusu
+bu süreçte çalışır. Ölçülenler: görev/s, p50/p95 gecikme, retry (hata + model bulunamadı),
+CPU süresi ve en yüksek RSS. Sonuçlar results/ altına JSON olarak kaydedilir ve
+--compare ile önceki bir sonuçla karşılaştırılır.
+
+Örnek:
+    python3 benchmarks/run_benchmarks.py --tasks 40 --latency 0.05 --token-rate 2000 --save
+    python3 benchmarks/run_benchmarks.py --compare benchmarks/results/<önceki>.json
+    python3 benchmarks/run_benchmarks.py --scenarios summary_http --workers 16   # HTTP yük testi (istek/s, p95)
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+RULES_DIR = BENCH_DIR.parent
+RESULTS_DIR = BENCH_DIR / "results"
+RESULT_MARKER = "BENCH_RESULT "
+
+sys.path.insert(0, str(BENCH_DIR))
+from stub_ollama import StubOllama, StubConfig
+
+SCENARIOS = ("agent_auto", "bridge", "queue", "session_summary", "summary_http")
+
+# model yönlendirmesini çeşitlendirmek için dönüşümlü sprint satırları
+SPRINT_TOPICS = (
+    "Flutter widget ile seans ekranı",
+    "Firestore schema ile randevu koleksiyonu",
+    "Danışan geçmişi için özet metni",
+)
+
+
+def _sprint_lines(n: int) -> list[str]:
+    return [f"Sprint {i + 1} - {SPRINT_TOPICS[i % len(SPRINT_TOPICS)]} #{i + 1}" for i in range(n)]
+
+
+def _emit(latencies: list[float], ok: int, units: int):
+    print(RESULT_MARKER + json.dumps({"latencies": latencies, "ok": ok, "units": units}), flush=True)
+
+
+# === DRIVER'LAR (alt süreçte, geçici dizinde çalışır) ===
+
+def drive_agent_auto(n: int, workers: int):
+    os.environ["AGENT_AUTO_WORKERS"] = str(workers)
+    Path("tasks.txt").write_text("\n".join(_sprint_lines(n)) + "\n", encoding="utf-8")
+    import agent_auto
+
+    latencies = []
+    original = agent_auto.process_task
+
+    def timed(file_path):
+        started = time.monotonic()
+        try:
+            original(file_path)
+        finally:
+            latencies.append(time.monotonic() - started)
+
+    agent_auto.process_task = timed
+    agent_auto.generate_tasks("tasks.txt")
+    agent_auto.task_pool.shutdown(wait=True)
+    ok = len(os.listdir(agent_auto.PROCESSED_DIR))
+    _emit(latencies, ok, n)
+
+
+def drive_bridge(n: int, workers: int):
+    sys.path.insert(0, str(RULES_DIR / "scripts"))
+    import goose_sprint_bridge as bridge
+
+    latencies = []
+    ok = 0
+    for line in _sprint_lines(n):
+        started = time.monotonic()
+        try:
+            result = bridge.try_with_fallbacks(bridge.choose_model(line), bridge.build_prompt(line), bypass_cache=True)
+            bridge.validate_and_annotate_schema(result.get("response", ""))
+            ok += 1
+        except Exception as e:
+            print(f"bridge hatası: {e}", file=sys.stderr)
+        latencies.append(time.monotonic() - started)
+    _emit(latencies, ok, n)
+
+
+def drive_queue(n: int, workers: int):
+    project = Path("project").resolve()
+    (project / "lib").mkdir(parents=True, exist_ok=True)
+    (project / "pubspec.yaml").write_text("name: bench\n", encoding="utf-8")
+    config = {
+        "project_root": str(project),
+        "output_dir": "lib/widgets/generated",
+        "file_prefix": "fsm_gen_",
+        "plan_model": "mistral",
+        "code_model": "deepseek-coder",
+        "fix_model": "deepseek-coder",
+        "max_retries": 3,
+        "auto_commit": False,
+        "notify": False,
+        "analysis_server": False,
+        "test_commands": [["flutter", "analyze"]],
+    }
+    Path("fsm_config_project.json").write_text(json.dumps(config), encoding="utf-8")
+    Path("task_queue.txt").write_text("\n".join(_sprint_lines(n)) + "\n", encoding="utf-8")
+    import queue_runner
+
+    results = queue_runner.process_queue("task_queue.txt", db_path=str(Path("queue.db").resolve()), workers=workers)
+    results = results or []
+    _emit([r["seconds"] for r in results], sum(1 for r in results if r["success"]), n)
+
+
+def drive_session_summary(n: int, workers: int):
+    sys.path.insert(0, str(RULES_DIR / "scripts" / "functions"))
+    import session_summary
+
+    client = session_summary.app.test_client()
+    latencies = []
+    ok = 0
+    for i in range(n):
+        started = time.monotonic()
+        r = client.post("/summarize_and_export", json={
+            "notes": f"Danışan uyku sorunlarından bahsetti. Seans {i}.",
+            "patient": f"P{i}",
+            "therapist": "T",
+        })
+        if r.status_code == 200:
+            ok += 1
+        latencies.append(time.monotonic() - started)
+    _emit(latencies, ok, n)
+
+
+def drive_summary_http(n: int, workers: int):
+    """Yük testi: çok thread'li sunucuya `workers` eşzamanlı istemciden HTTP istekleri."""
+    sys.path.insert(0, str(RULES_DIR / "scripts" / "functions"))
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    import requests
+    import session_summary
+
+    server = session_summary.create_server("127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/summarize_and_export"
+    local = threading.local()
+
+    def one(i: int):
+        # her istemci thread'i kendi keep-alive oturumunu kullanır
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        started = time.monotonic()
+        try:
+            r = local.session.post(url, json={
+                "notes": f"Danışan uyku sorunlarından bahsetti. Seans {i}.",
+                "patient": f"P{i}",
+                "therapist": "T",
+            }, timeout=60)
+            ok = r.status_code == 200
+        except requests.RequestException:
+            ok = False
+        return ok, time.monotonic() - started
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(one, range(n)))
+    session_summary.shutdown_server(server, grace=5)
+    _emit([lat for _, lat in results], sum(ok for ok, _ in results), n)
+
+
+DRIVERS = {
+    "agent_auto": drive_agent_auto,
+    "bridge": drive_bridge,
+    "queue": drive_queue,
+    "session_summary": drive_session_summary,
+    "summary_http": drive_summary_http,
+}
+
+
+# === HARNESS ===
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _fake_analyzer_bin(root: Path) -> Path:
+    """TEST aşaması için anında başarılı dönen flutter/dart (Flutter SDK gerektirmez)."""
+    bin_dir = root / "bin"
+    bin_dir.mkdir(exist_ok=True)
+    for name in ("flutter", "dart"):
+        path = bin_dir / name
+        path.write_text("#!/bin/sh\nexit 0\n", encoding="utf-8")
+        path.chmod(0o755)
+    return bin_dir
+
+
+def run_scenario(name: str, args, stub: StubOllama) -> dict:
+    with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as tmp:
+        tmp_path = Path(tmp)
+        env = os.environ.copy()
+        env.update({
+            "PYTHONPATH": os.pathsep.join([str(RULES_DIR), env.get("PYTHONPATH", "")]),
+            "OLLAMA_API": stub.generate_url,
+            "OLLAMA_URL": stub.generate_url,
+            "OLLAMA_HOST": stub.base_url,
+            "LLM_CACHE_DISABLE": "1",
+            "SUMMARY_CACHE_DISABLE": "1",
+            "SUMMARY_CACHE_DIR": str(tmp_path / "summary_cache"),
+            "FSM_TRACE_FILE": str(tmp_path / "fsm_trace.jsonl"),
+            "FSM_QUEUE_DB": str(tmp_path / "queue.db"),
+            "SESSION_JOBS_DB": str(tmp_path / "session_jobs.db"),
+        })
+        if name == "queue":
+            env["PATH"] = os.pathsep.join([str(_fake_analyzer_bin(tmp_path)), env.get("PATH", "")])
+
+        before = stub.stats.snapshot()
+        started = time.monotonic()
+        with open(tmp_path / "driver.err", "w+", encoding="utf-8") as err:
+            proc = subprocess.Popen(
+                [sys.executable, str(Path(__file__).resolve()), "--drive", name,
+                 "--tasks", str(args.tasks), "--workers", str(args.workers)],
+                cwd=tmp,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=None if args.verbose else err,
+                text=True,
+            )
+            stdout = proc.stdout.read()
+            proc.stdout.close()
+            # wait4: bu çocuğa (ve torunlarına) ait CPU süresi ve en yüksek RSS
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            wall = time.monotonic() - started
+            after = stub.stats.snapshot()
+            err.seek(0)
+            stderr = err.read()
+
+    result = None
+    for line in stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            result = json.loads(line[len(RESULT_MARKER):])
+    if args.verbose:
+        print(stdout)
+    if proc.returncode != 0 or result is None:
+        tail = (stderr or "").strip().splitlines()[-5:]
+        return {"scenario": name, "status": "error", "returncode": proc.returncode, "stderr": tail}
+
+    latencies = result["latencies"]
+    requests = after["requests"] - before["requests"]
+    errors = after["errors"] - before["errors"]
+    not_found = after["not_found"] - before["not_found"]
+    return {
+        "scenario": name,
+        "status": "ok",
+        "units": result["units"],
+        "ok": result["ok"],
+        "wall_s": round(wall, 3),
+        "tasks_per_s": round(result["units"] / wall, 3) if wall else 0.0,
+        "p50_s": round(_percentile(latencies, 50), 4),
+        "p95_s": round(_percentile(latencies, 95), 4),
+        "model_requests": requests,
+        "retries": errors + not_found,
+        "injected_errors": errors,
+        "model_not_found": not_found,
+        "model_swaps": after["swaps"] - before["swaps"],
+        "cpu_s": round(usage.ru_utime + usage.ru_stime, 3),
+        # Linux'ta ru_maxrss KB
+        "max_rss_mb": round(usage.ru_maxrss / 1024, 1),
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> bool:
+    """tasks/s düşüşü veya p95 artışı tolerance'ı aşarsa regresyon sayılır."""
+    regressed = False
+    base = {r["scenario"]: r for r in baseline.get("results", []) if r.get("status") == "ok"}
+    print(f"\n{'senaryo':<16} {'tasks/s':>18} {'p95(s)':>20}")
+    for r in current["results"]:
+        b = base.get(r["scenario"])
+        if r.get("status") != "ok" or b is None:
+            continue
+        d_tps = (r["tasks_per_s"] - b["tasks_per_s"]) / b["tasks_per_s"] if b["tasks_per_s"] else 0.0
+        d_p95 = (r["p95_s"] - b["p95_s"]) / b["p95_s"] if b["p95_s"] else 0.0
+        flag = ""
+        if d_tps < -tolerance or d_p95 > tolerance:
+            flag = "  ⚠️ regresyon"
+            regressed = True
+        print(
+            f"{r['scenario']:<16} {b['tasks_per_s']:>7.2f} → {r['tasks_per_s']:<7.2f} ({d_tps:+.0%})"
+            f" {b['p95_s']:>7.3f} → {r['p95_s']:<7.3f} ({d_p95:+.0%}){flag}"
+        )
+    return regressed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Stub Ollama ile uçtan uca throughput benchmark'ları")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"virgülle: {','.join(SCENARIOS)}")
+    parser.add_argument("--tasks", type=int, default=30, help="senaryo başına görev/istek sayısı")
+    parser.add_argument("--workers", type=int, default=4, help="agent_auto havuzu / queue_runner süreç sayısı / summary_http eşzamanlı istemci")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub: yanıt öncesi gecikme (s)")
+    parser.add_argument("--token-rate", type=float, default=2000.0, help="stub: token/s (0 = anında)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="stub: 500 olasılığı")
+    parser.add_argument("--missing-model", action="append", default=[], help="stub: 'model not found' dönecek model")
+    parser.add_argument("--seed", type=int, default=1, help="stub hata enjeksiyonu için rastgele tohum")
+    parser.add_argument("--save", action="store_true", help="sonucu results/ altına kaydet")
+    parser.add_argument("--output", help="sonuç dosyası yolu (varsayılan results/<zaman>.json)")
+    parser.add_argument("--compare", help="karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="regresyon eşiği (oran)")
+    parser.add_argument("--verbose", action="store_true", help="driver çıktısını göster")
+    parser.add_argument("--drive", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.drive:
+        DRIVERS[args.drive](args.tasks, args.workers)
+        return 0
+
+    config = StubConfig(args.latency, args.token_rate, args.error_rate, args.missing_model, seed=args.seed)
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    results = []
+    with StubOllama(config) as stub:
+        print(f"🧪 Stub Ollama: {stub.generate_url}")
+        for name in scenarios:
+            if name not in DRIVERS:
+                print(f"❓ Bilinmeyen senaryo: {name}")
+                continue
+            print(f"▶️ {name} ({args.tasks} görev)...")
+            result = run_scenario(name, args, stub)
+            results.append(result)
+            if result["status"] == "ok":
+                print(
+                    f"   {result['tasks_per_s']:.2f} görev/s, p50 {result['p50_s']:.3f}s, p95 {result['p95_s']:.3f}s, "
+                    f"ok {result['ok']}/{result['units']}, retry {result['retries']}, swap {result['model_swaps']}, "
+                    f"CPU {result['cpu_s']:.2f}s, RSS {result['max_rss_mb']:.0f}MB"
+                )
+            else:
+                print(f"   ❌ çalıştırılamadı (rc={result['returncode']}): {' | '.join(result['stderr'])}")
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "params": {
+            "tasks": args.tasks,
+            "workers": args.workers,
+            "latency": args.latency,
+            "token_rate": args.token_rate,
+            "error_rate": args.error_rate,
+            "missing_models": args.missing_model,
+        },
+        "results": results,
+    }
+    if args.save or args.output:
+        out = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"💾 Sonuç kaydedildi: {out}")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if compare(report, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Sahte Ollama sunucusu (benchmark'lar için, tamamen offline).
+
+/api/generate ve /api/chat uçlarını stream'li (NDJSON) ve stream'siz taklit eder:
+- latency: yanıt başlamadan önceki sabit gecikme (model yükleme/prompt değerlendirme)
+- token_rate: saniyede üretilen token (0 = anında)
+- error_rate: rastgele 500 dönme olasılığı
+- missing_models: bu modeller için Ollama'nın "model not found" 404 yanıtı
+İstek sayıları ve sunucu tarafı süreler stats() ile okunur.
+
+Tek başına: python3 stub_ollama.py --port 11555 --latency 0.2 --token-rate 200
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# agent_auto / bridge / FSM ayrıştırıcılarının tanıdığı bölümleri içeren sabit yanıt
+RESPONSE_TEXT = """### Flutter Widget ###
+import 'package:flutter/material.dart';
+
+class BenchWidget extends StatelessWidget {
+  const BenchWidget({super.key});
+
+  @override
+  Widget build(BuildContext context) {
+    return const Text('bench');
+  }
+}
+
+### Firestore Schema ###
+{"sessions": {"clientId": "string", "startedAt": "timestamp"}}
+
+### AI Summary Prompt ###
+- Affect: calm
+- Theme: sleep
+- ICD Suggestion: F51.0 - Insomnia
+
+### Prompt 📋 ###
+Summarize the session notes as affect, theme and icdSuggestion.
+"""
+
+
+class StubConfig:
+    def __init__(self, latency: float = 0.0, token_rate: float = 0.0, error_rate: float = 0.0,
+                 missing_models=(), response_text: str = RESPONSE_TEXT, seed: int | None = None):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.error_rate = error_rate
+        self.missing_models = set(missing_models)
+        self.response_text = response_text
+        self.random = random.Random(seed)
+
+
+class StubStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.not_found = 0
+        self.by_model = {}
+        self.durations = []
+        # ardışık isteklerde model değişimi (tek GPU'da model yükleme maliyeti)
+        self.swaps = 0
+        self._last_model = None
+
+    def record(self, model: str, seconds: float, outcome: str):
+        with self._lock:
+            self.requests += 1
+            self.by_model[model] = self.by_model.get(model, 0) + 1
+            if self._last_model is not None and model != self._last_model:
+                self.swaps += 1
+            self._last_model = model
+            if outcome == "error":
+                self.errors += 1
+            elif outcome == "not_found":
+                self.not_found += 1
+            else:
+                self.durations.append(seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "not_found": self.not_found,
+                "swaps": self.swaps,
+                "by_model": dict(self.by_model),
+                "durations": list(self.durations),
+            }
+
+
+def _tokens(text: str) -> list[str]:
+    # kaba token bölme: kelime + boşluk parçaları
+    parts, current = [], ""
+    for ch in text:
+        current += ch
+        if ch in " \n":
+            parts.append(current)
+            current = ""
+    if current:
+        parts.append(current)
+    return parts
+
+
+def make_handler(config: StubConfig, stats: StubStats):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, status: int, body: dict):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _write_chunk(self, obj: dict):
+            line = (json.dumps(obj) + "\n").encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/api/tags":
+                models = [{"name": m} for m in stats.snapshot()["by_model"]]
+                self._send_json(200, {"models": models})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            started = time.monotonic()
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                self._send_json(400, {"error": "invalid json"})
+                return
+            chat = self.path.rstrip("/") == "/api/chat"
+            if not chat and self.path.rstrip("/") != "/api/generate":
+                self._send_json(404, {"error": "not found"})
+                return
+            model = body.get("model", "")
+            if model in config.missing_models:
+                stats.record(model, 0.0, "not_found")
+                self._send_json(404, {"error": f"model '{model}' not found, try pulling it first"})
+                return
+            if config.error_rate and config.random.random() < config.error_rate:
+                stats.record(model, 0.0, "error")
+                self._send_json(500, {"error": "stub: injected failure"})
+                return
+
+            if config.latency:
+                time.sleep(config.latency)
+            tokens = _tokens(config.response_text)
+            per_token = 1.0 / config.token_rate if config.token_rate else 0.0
+            eval_started = time.monotonic()
+            # Ollama varsayılanı stream=True
+            stream = body.get("stream", True)
+
+            def piece(text: str, done: bool) -> dict:
+                if chat:
+                    obj = {"model": model, "message": {"role": "assistant", "content": text}, "done": done}
+                else:
+                    obj = {"model": model, "response": text, "done": done}
+                if done:
+                    obj.update({
+                        "done_reason": "stop",
+                        "prompt_eval_count": len(_tokens(json.dumps(body.get("prompt") or body.get("messages") or ""))),
+                        "eval_count": len(tokens),
+                        "eval_duration": int((time.monotonic() - eval_started) * 1e9),
+                        "total_duration": int((time.monotonic() - started) * 1e9),
+                    })
+                return obj
+
+            if stream:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for tok in tokens:
+                    if per_token:
+                        time.sleep(per_token)
+                    self._write_chunk(piece(tok, False))
+                self._write_chunk(piece("", True))
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            else:
+                if per_token:
+                    time.sleep(per_token * len(tokens))
+                final = piece(config.response_text, True)
+                self._send_json(200, final)
+            stats.record(model, time.monotonic() - started, "ok")
+
+    return Handler
+
+
+class StubOllama:
+    """Arka plan thread'inde çalışan sahte sunucu; with bloğu ile kullanılabilir."""
+
+    def __init__(self, config: StubConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubConfig()
+        self.stats = StubStats()
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.config, self.stats))
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def generate_url(self) -> str:
+        return f"{self.base_url}/api/generate"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sahte Ollama /api/generate sunucusu")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11555)
+    parser.add_argument("--latency", type=float, default=0.0, help="yanıt öncesi gecikme (s)")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="token/s (0 = anında)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 dönme olasılığı (0-1)")
+    parser.add_argument("--missing-model", action="append", default=[], help="'model not found' dönecek model")
+    args = parser.parse_args(argv)
+    config = StubConfig(args.latency, args.token_rate, args.error_rate, args.missing_model)
+    stub = StubOllama(config, args.host, args.port)
+    print(f"🧪 Stub Ollama: {stub.generate_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,213 @@
+"""
+(endpoint, model) başına devre kesici ve paylaşılan model sağlık durumu.
+
+agent_auto.query_model() ve goose_sprint_bridge.try_with_fallbacks() aynı süreç-genel
+kayıt defterini kullanır; bir görevin öğrendiği "model yok / model çöküyor" bilgisi
+sonraki görevlere taşınır:
+- closed: çağrılara izin verilir; art arda BREAKER_THRESHOLD hata → open
+- open: model atlanır; bekleme süresi dolunca → half-open
+- half-open: tek deneme çağrısına izin verilir; başarı → closed, hata → open (süre katlanır)
+- model bulunamadı (404): doğrudan open, MISSING_COOLDOWN boyunca
+
+call_with_fallbacks() başarısız modeli jitter'lı bekleme süresine alır ve beklemeden
+sıradaki modele geçer; thread yalnızca tüm adaylar beklemedeyse uyur.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+
+BREAKER_THRESHOLD = int(os.environ.get("OLLAMA_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.environ.get("OLLAMA_BREAKER_COOLDOWN", "30"))
+BREAKER_MAX_COOLDOWN = float(os.environ.get("OLLAMA_BREAKER_MAX_COOLDOWN", "300"))
+MISSING_COOLDOWN = float(os.environ.get("OLLAMA_MISSING_COOLDOWN", "600"))
+# retry bekleme tabanı: deneme n için uniform(0, base * 2**(n-1)) (full jitter)
+RETRY_BACKOFF = float(os.environ.get("OLLAMA_RETRY_BACKOFF", "1.0"))
+RETRY_BACKOFF_MAX = float(os.environ.get("OLLAMA_RETRY_BACKOFF_MAX", "8.0"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+logger = logging.getLogger("circuit_breaker")
+
+
+class ModelNotFoundError(RuntimeError):
+    """Ollama modeli tanımıyor (pull edilmemiş); yeniden denemek anlamsız."""
+
+
+class ModelsUnavailableError(RuntimeError):
+    """Hiçbir aday model yanıt vermedi veya hepsinin devresi açık."""
+
+    def __init__(self, message: str, last_error: Exception | None = None):
+        super().__init__(message)
+        self.last_error = last_error
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN,
+                 max_cooldown: float = BREAKER_MAX_COOLDOWN):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = cooldown
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+            # half-open: aynı anda tek deneme
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def retry_after(self) -> float:
+        """Açık devrenin tekrar deneneceği ana kalan süre (kapalıysa 0)."""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def record_success(self) -> bool:
+        """Devre kapalı değilken başarı gelirse (kapandıysa) True."""
+        with self._lock:
+            recovered = self.state != CLOSED
+            self.state = CLOSED
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._probe_in_flight = False
+            return recovered
+
+    def record_failure(self) -> bool:
+        """Hata bu çağrıda devreyi açtıysa True."""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # deneme başarısız: bir sonraki bekleme iki katı
+                self._open(min(self.cooldown * 2, self.max_cooldown))
+                return True
+            if self.state == CLOSED and self.failures >= self.threshold:
+                self._open(self.base_cooldown)
+                return True
+            return False
+
+    def trip(self, cooldown: float):
+        """Kalıcı görünen hata (model yok): eşik beklenmeden açılır."""
+        with self._lock:
+            self._open(cooldown)
+
+    def _open(self, cooldown: float):
+        self.state = OPEN
+        self.cooldown = cooldown
+        self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "cooldown": self.cooldown}
+
+
+class BreakerRegistry:
+    def __init__(self):
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint: str, model: str) -> CircuitBreaker:
+        key = (endpoint, model)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(f"{model}@{endpoint}")
+            return breaker
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {f"{m}@{e}": b.snapshot() for (e, m), b in self._breakers.items()}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_breakers() -> BreakerRegistry:
+    """Süreç-genel kayıt defteri (ilk çağrıda oluşturulur)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = BreakerRegistry()
+    return _registry
+
+
+def backoff_delay(attempt: int, base: float = RETRY_BACKOFF, cap: float = RETRY_BACKOFF_MAX) -> float:
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def call_with_fallbacks(endpoint: str, models, call, attempts: int = 3, registry: BreakerRegistry | None = None,
+                        log: logging.Logger | None = None):
+    """Modelleri tercih sırasıyla dener; call(model) sonucu ve kullanılan modeli döner.
+
+    call(model) ModelNotFoundError fırlatırsa model devre dışı bırakılır, diğer hatalarda
+    model jitter'lı beklemeye alınır ve sıradaki hazır modele geçilir. Açık devreli
+    modeller hiç çağrılmaz. Hiçbiri başarılı olmazsa ModelsUnavailableError.
+    """
+    registry = registry or get_breakers()
+    log = log or logger
+    # model -> (sıradaki deneme numarası, hazır olacağı an)
+    schedule = {m: (1, 0.0) for m in dict.fromkeys(models)}
+    order = list(schedule)
+    last_err = None
+    while schedule:
+        now = time.monotonic()
+        ready = [m for m in order if m in schedule and schedule[m][1] <= now]
+        if not ready:
+            # tüm adaylar beklemede: en yakın olana kadar uyu
+            time.sleep(max(0.0, min(t for _, t in schedule.values()) - now))
+            continue
+        model = ready[0]
+        attempt, _ = schedule[model]
+        breaker = registry.get(endpoint, model)
+        if not breaker.allow():
+            log.info(f"⏭️ {model} atlanıyor: devre açık ({breaker.retry_after():.0f}s)")
+            del schedule[model]
+            continue
+        try:
+            result = call(model)
+        except ModelNotFoundError as e:
+            last_err = e
+            breaker.trip(MISSING_COOLDOWN)
+            log.warning(f"Model '{model}' bulunamadı, {MISSING_COOLDOWN:.0f}s devre dışı; sonraki modele geçilecek.")
+            del schedule[model]
+            continue
+        except Exception as e:
+            last_err = e
+            if breaker.record_failure():
+                log.warning(f"🔴 {breaker.name}: devre açıldı ({breaker.cooldown:.0f}s)")
+            if attempt >= attempts:
+                log.warning(f"Model çağrısı hatası ({attempt}/{attempts}) model='{model}': {e}. Denemeler tükendi.")
+                del schedule[model]
+                continue
+            delay = backoff_delay(attempt)
+            log.warning(f"Model çağrısı hatası ({attempt}/{attempts}) model='{model}': {e}. {delay:.1f}s sonra tekrar sırada.")
+            schedule[model] = (attempt + 1, time.monotonic() + delay)
+            continue
+        if breaker.record_success():
+            log.info(f"🟢 {breaker.name}: devre kapandı")
+        return result, model
+    if last_err is None:
+        raise ModelsUnavailableError("Tüm modellerin devresi açık")
+    raise ModelsUnavailableError(f"Tüm model çağrıları başarısız oldu: {last_err}", last_err)
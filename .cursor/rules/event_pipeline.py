@@ -0,0 +1,92 @@
+"""
+Dosya sistemi olayları için yol başına birleştirme (agent_auto.py WatchHandler).
+
+Tek bir global debounce yerine her yolun kendi zamanlayıcısı vardır: aynı dosyaya gelen
+art arda yazmalar tek olaya indirgenir, farklı dosyalara gelen olaylar kaybolmaz.
+Son olaydan `delay` saniye sonra (sürekli yazılan dosyada en geç `max_delay` sonra) vadesi
+gelen tüm yollar tek bir parti olarak işleyiciye verilir. Ajanın kendi yazdığı dizinler
+(logs/, outputs/, prompts/ ...) ignore glob'larıyla en baştan elenir.
+"""
+
+import os
+import time
+import fnmatch
+import logging
+import threading
+
+logger = logging.getLogger("agent_auto")
+
+
+class EventCoalescer:
+    def __init__(self, handle_batch, root: str = ".", delay: float = 0.5, max_delay: float | None = None,
+                 ignore=()):
+        self.handle_batch = handle_batch
+        self.root = os.path.abspath(root)
+        self.delay = delay
+        self.max_delay = max_delay if max_delay is not None else delay * 5
+        self.ignore = [p.strip() for p in ignore if p.strip()]
+        # yol -> (ilk olay anı, son olay anı)
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self.received = 0
+        self.ignored = 0
+        self.delivered = 0
+        self._thread = threading.Thread(target=self._run, name="event_coalescer", daemon=True)
+
+    def is_ignored(self, path: str) -> bool:
+        rel = os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+        name = os.path.basename(rel)
+        return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(name, p) for p in self.ignore)
+
+    def push(self, path: str):
+        if self.is_ignored(path):
+            self.ignored += 1
+            return
+        now = time.monotonic()
+        with self._cond:
+            self.received += 1
+            first, _ = self._pending.get(path, (now, now))
+            self._pending[path] = (first, now)
+            self._cond.notify()
+
+    def _due_at(self, first: float, last: float) -> float:
+        return min(last + self.delay, first + self.max_delay)
+
+    def _take_batch(self) -> list[str] | None:
+        with self._cond:
+            while True:
+                if self._stopped:
+                    return None
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                due = [p for p, (f, l) in self._pending.items() if self._due_at(f, l) <= now]
+                if due:
+                    for p in due:
+                        del self._pending[p]
+                    return due
+                self._cond.wait(min(self._due_at(f, l) for f, l in self._pending.values()) - now)
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            self.delivered += len(batch)
+            try:
+                self.handle_batch(batch)
+            except Exception as e:
+                logger.error(f"Olay partisi işlenirken hata: {e}")
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # bekleyen olaylar atılır; tasks.txt bir sonraki başlangıçta zaten taranır
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
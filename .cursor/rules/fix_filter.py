@@ -1,46 +1,21 @@
-import sys, re
-text = sys.stdin.read()
-
-# Zero-width ve BOM temizliği
-text = text.encode('utf-8','ignore').decode('utf-8')
-text = text.replace('\ufeff','')  # BOM
-text = re.sub(r'[\u200B-\u200D\uFEFF]', '', text)  # zero-width
-
-# Log/emoji/markdown temizliği
-text = re.sub(r'^.*?(?=import|class)', '', text, flags=re.DOTALL)  # başlangıçtaki her şeyi import|class'e kadar at
-text = re.sub(r'```.*?```', '', text, flags=re.DOTALL)  # code fences
-text = re.sub(r'^#.*$', '', text, flags=re.MULTILINE)  # markdown başlık
-text = re.sub(r'^//.*$', '', text, flags=re.MULTILINE)  # tek satır yorum
-text = re.sub(r'/\*.*?\*/', '', text, flags=re.DOTALL)  # çok satır yorum
-text = re.sub(r'[\ud800-\udfff]', '', text)  # surrogate aralığı (emoji vb.)
-
-# Sadece Dart kodu kalsın: import satırları ve sınıf/ana fonksiyon gövdeleri
-# Önce code fence içi varsa onu al
-fenced = re.findall(r"```(?:dart)?\s*([\s\S]*?)```", text, re.I)
-if fenced:
-    text = fenced[-1]
-
-# Import'ları topla ve benzersizleştir
-imports = re.findall(r"import\s+['\"][^'\"]+['\"];", text)
-unique_imports = []
-for imp in imports:
-    if imp not in unique_imports:
-        unique_imports.append(imp)
-imports_text = "\n".join(unique_imports) + ("\n\n" if unique_imports else "")
-
-# Import'ları içerikten çıkar
-body = re.sub(r"import\s+['\"][^'\"]+['\"];", '', text).strip()
-
-# Eğer sınıf/ana fonksiyon bulunmuyorsa, veya gövde boşsa -> fallback
-has_class = re.search(r"\bclass\s+\w+\s+extends\s+(StatelessWidget|StatefulWidget)\b", body)
-has_main = re.search(r"\bvoid\s+main\s*\(", body)
-looks_like_dart = bool(has_class or has_main)
-
-# İçerikte bariz log kelimeleri varsa geçersiz say
-contains_logs = re.search(r"Durum:|Plan:|Test|EVAL|SUCCESS|FAILURE|\bFSM\b|Kod dosyaya yazıldı|Test ediliyor", body)
-
-if not looks_like_dart or contains_logs:
-    print("""import 'package:flutter/material.dart';
+"""
+LLM/FSM çıktısından yalnızca Dart kodunu ayıklar; Dart gibi görünmüyorsa HelloBox yer tutucusunu döner.
+
+    python3 fix_filter.py < cikti.txt > widget.dart          # tek parça (stdin → stdout)
+    python3 fix_filter.py --batch                            # outputs/, logs/, lib/components altındaki her dosya
+    python3 fix_filter.py --batch outputs --workers 8 --out-dir cleaned
+
+İçe aktarılabilir: from fix_filter import clean_dart  →  (kod, fallback_mu)
+"""
+
+import os
+import re
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+HELLO_BOX = """import 'package:flutter/material.dart';
 
 class HelloBox extends StatelessWidget {
   const HelloBox({super.key});
@@ -52,8 +27,176 @@ class HelloBox extends StatelessWidget {
     );
   }
 }
-""".strip())
-    sys.exit(0)
+""".strip()
+
+DEFAULT_ROOTS = ("outputs", "logs", "lib/components")
+DEFAULT_EXTENSIONS = (".dart", ".txt", ".md")
+
+# desenler modül yüklenirken bir kez derlenir (batch'te her dosya için yeniden derlenmez)
+ZERO_WIDTH_RE = re.compile(r'[\u200B-\u200D\uFEFF]')
+LEADING_NOISE_RE = re.compile(r'^.*?(?=import|class)', re.DOTALL)
+CODE_FENCE_RE = re.compile(r'```.*?```', re.DOTALL)
+MD_HEADING_RE = re.compile(r'^#.*$', re.MULTILINE)
+LINE_COMMENT_RE = re.compile(r'^//.*$', re.MULTILINE)
+BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+SURROGATE_RE = re.compile(r'[\ud800-\udfff]')
+FENCED_DART_RE = re.compile(r"```(?:dart)?\s*([\s\S]*?)```", re.I)
+IMPORT_RE = re.compile(r"import\s+['\"][^'\"]+['\"];")
+WIDGET_CLASS_RE = re.compile(r"\bclass\s+\w+\s+extends\s+(StatelessWidget|StatefulWidget)\b")
+MAIN_RE = re.compile(r"\bvoid\s+main\s*\(")
+LOG_WORDS_RE = re.compile(r"Durum:|Plan:|Test|EVAL|SUCCESS|FAILURE|\bFSM\b|Kod dosyaya yazıldı|Test ediliyor")
+
+
+def clean_dart(text: str) -> tuple[str, bool]:
+    """Temizlenmiş Dart kodunu ve HelloBox'a düşülüp düşülmediğini döner."""
+    # Zero-width ve BOM temizliği
+    text = text.encode('utf-8', 'ignore').decode('utf-8')
+    text = text.replace('\ufeff', '')  # BOM
+    text = ZERO_WIDTH_RE.sub('', text)  # zero-width
+
+    # Log/emoji/markdown temizliği
+    text = LEADING_NOISE_RE.sub('', text)  # başlangıçtaki her şeyi import|class'e kadar at
+    text = CODE_FENCE_RE.sub('', text)  # code fences
+    text = MD_HEADING_RE.sub('', text)  # markdown başlık
+    text = LINE_COMMENT_RE.sub('', text)  # tek satır yorum
+    text = BLOCK_COMMENT_RE.sub('', text)  # çok satır yorum
+    text = SURROGATE_RE.sub('', text)  # surrogate aralığı (emoji vb.)
+
+    # Sadece Dart kodu kalsın: import satırları ve sınıf/ana fonksiyon gövdeleri
+    # Önce code fence içi varsa onu al
+    fenced = FENCED_DART_RE.findall(text)
+    if fenced:
+        text = fenced[-1]
+
+    # Import'ları topla ve benzersizleştir
+    unique_imports = list(dict.fromkeys(IMPORT_RE.findall(text)))
+    imports_text = "\n".join(unique_imports) + ("\n\n" if unique_imports else "")
+
+    # Import'ları içerikten çıkar
+    body = IMPORT_RE.sub('', text).strip()
+
+    # Eğer sınıf/ana fonksiyon bulunmuyorsa, veya gövde boşsa -> fallback
+    looks_like_dart = bool(WIDGET_CLASS_RE.search(body) or MAIN_RE.search(body))
+
+    # İçerikte bariz log kelimeleri varsa geçersiz say
+    contains_logs = LOG_WORDS_RE.search(body)
+
+    if not looks_like_dart or contains_logs:
+        return HELLO_BOX, True
+
+    # Geçerli gövde ise, importları üstte birleştirerek yaz
+    return (imports_text + body).strip(), False
+
+
+# === BATCH ===
+
+def iter_sources(roots, extensions=DEFAULT_EXTENSIONS, exclude: Path | None = None):
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            yield root
+            continue
+        if not root.is_dir():
+            continue
+        for path in sorted(root.rglob("*")):
+            if not path.is_file() or path.suffix not in extensions:
+                continue
+            if exclude is not None and exclude in path.resolve().parents:
+                continue
+            yield path
+
+
+def _destination(src: Path, out_dir: Path | None) -> Path:
+    if out_dir is None:
+        # yerinde: .dart üzerine yazılır, diğerlerinin yanına .dart oluşturulur
+        return src.with_suffix(".dart")
+    rel = Path(os.path.relpath(src.resolve(), Path.cwd())).with_suffix(".dart")
+    if rel.parts and rel.parts[0] == "..":
+        rel = Path(src.name).with_suffix(".dart")
+    return out_dir / rel
+
+
+def fix_file(src: str, dst: str, write_fallback: bool = True) -> dict:
+    """Tek dosyayı temizleyip dst'ye yazar; worker süreçlerinde de çalışır.
+
+    write_fallback=False (yerinde mod): HelloBox'a düşülürse hiçbir şey yazılmaz, dosya raporlanır.
+    """
+    result = {"src": src, "dst": dst, "fallback": False, "skipped": None, "error": None}
+    try:
+        if os.path.abspath(src) == os.path.abspath(dst):
+            # temizleme kayıplıdır (yorumlar, importlar); kaynak .dart kendi üzerine yazılmaz
+            result["skipped"] = "kaynak .dart dosyası yerinde temizlenmez"
+            return result
+        with open(src, "r", encoding="utf-8", errors="replace") as f:
+            code, fell_back = clean_dart(f.read())
+        result["fallback"] = fell_back
+        if fell_back and not write_fallback:
+            result["skipped"] = "Dart bulunamadı, yer tutucu yazılmadı"
+            return result
+        os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+        with open(dst, "w", encoding="utf-8") as f:
+            f.write(code + "\n")
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def run_batch(roots=DEFAULT_ROOTS, out_dir: str | None = "cleaned", workers: int | None = None,
+              extensions=DEFAULT_EXTENSIONS) -> list[dict]:
+    out_path = Path(out_dir) if out_dir else None
+    exclude = out_path.resolve() if out_path else None
+    jobs = [(str(src), str(_destination(src, out_path))) for src in iter_sources(roots, extensions, exclude)]
+    if not jobs:
+        return []
+    # yerinde modda HelloBox hiçbir zaman bir dosyanın üzerine yazılmaz
+    write_fallback = [out_path is not None] * len(jobs)
+    if workers == 1 or len(jobs) == 1:
+        return [fix_file(src, dst, wf) for (src, dst), wf in zip(jobs, write_fallback)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # küçük dosyalar: süreçler arası gidiş-dönüşü azaltmak için parça parça
+        chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+        return list(pool.map(fix_file, *zip(*jobs), write_fallback, chunksize=chunksize))
+
+
+def print_summary(results: list[dict]):
+    errors = [r for r in results if r["error"]]
+    skipped = [r for r in results if r["skipped"]]
+    fallbacks = [r for r in results if r["fallback"] and not r["skipped"]]
+    cleaned = len(results) - len(fallbacks) - len(skipped) - len(errors)
+    print(f"📊 {len(results)} dosya: {cleaned} temizlendi, {len(fallbacks)} HelloBox fallback, "
+          f"{len(skipped)} atlandı, {len(errors)} hata")
+    for r in fallbacks:
+        print(f"   🧩 HelloBox: {r['src']}")
+    for r in skipped:
+        print(f"   ⏭️ {r['src']}: {r['skipped']}")
+    for r in errors:
+        print(f"   ❌ {r['src']}: {r['error']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="LLM çıktısından Dart kodunu ayıklar")
+    parser.add_argument("--batch", nargs="*", metavar="DIR",
+                        help=f"dizin/dosyaları toplu temizle (varsayılan: {', '.join(DEFAULT_ROOTS)})")
+    parser.add_argument("--out-dir", default="cleaned", help="batch çıktı dizini (kaynak yol yapısı korunur)")
+    parser.add_argument("--in-place", action="store_true",
+                        help="batch sonucunu kaynağın yanına .dart olarak yaz (.dart kaynaklar ve Dart bulunamayanlar atlanır)")
+    parser.add_argument("--workers", type=int, default=None, help="worker süreci sayısı (varsayılan: CPU sayısı)")
+    parser.add_argument("--ext", action="append", help="işlenecek uzantı (tekrarlanabilir, ör. --ext .txt)")
+    args = parser.parse_args(argv)
+
+    if args.batch is None:
+        print(clean_dart(sys.stdin.read())[0])
+        return 0
+
+    results = run_batch(
+        args.batch or DEFAULT_ROOTS,
+        out_dir=None if args.in_place else args.out_dir,
+        workers=args.workers,
+        extensions=tuple(args.ext) if args.ext else DEFAULT_EXTENSIONS,
+    )
+    print_summary(results)
+    return 1 if any(r["error"] for r in results) else 0
+
 
-# Geçerli gövde ise, importları üstte birleştirerek yaz
-print((imports_text + body).strip())
+if __name__ == "__main__":
+    raise SystemExit(main())
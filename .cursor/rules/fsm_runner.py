@@ -1,24 +1,54 @@
 import json
 import os
+import sys
+import shutil
 import subprocess
+import threading
 import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from nodes.plan_node import plan_task
 from nodes.code_node import generate_code
 from nodes.test_node import test_code
 from nodes.eval_node import evaluate_output
 from nodes.fix_node import fix_code
+from nodes.analysis_server import DartAnalysisServer
+from fsm_trace import StageTracer
+from fix_filter import clean_dart
+
+# fix_filter HelloBox'a düştüğünde: yer tutucu yazılmaz, aday başarısız sayılıp FIX'e gider
+NOT_DART_ERROR = "❌ Çıktı Dart kodu değil (fix_filter yer tutucuya düştü); dosya yazılmadı"
 
 class EliteFSMRunner:
-    def __init__(self, config_path="fsm_config_project.json"):
+    def __init__(self, config_path="fsm_config_project.json", output_subdir=None):
         self.config = self.load_config(config_path)
         self.project_root = self.config["project_root"]
         self.output_dir = self.config["output_dir"]
+        if output_subdir:
+            # paralel queue worker'ları birbirinin dosyalarına/analizine karışmasın
+            self.output_dir = os.path.join(self.output_dir, output_subdir)
         self.file_prefix = self.config["file_prefix"]
         self.max_retries = self.config["max_retries"]
         self.auto_commit = self.config["auto_commit"]
         self.notify = self.config["notify"]
         self.test_commands = self.config["test_commands"]
+        # >1 ise CODE aşaması K aday üretir, TEST hepsini paralel dener; ilk geçen kazanır
+        self.speculative_candidates = max(1, int(self.config.get("speculative_candidates", 1)))
+        # aşama süreleri/token sayaçları logs/fsm_trace.jsonl'e yazılır
+        self.trace = self.config.get("trace", True)
+        # üretilen kod yazılmadan önce fix_filter ile aynı süreçte temizlenir (ayrı python3 süreci yok)
+        self.fix_filter = self.config.get("fix_filter", True)
+        # son başarılı çalıştırmanın (test edilmiş) dosyası; __main__ --out ile kopyalar
+        self.last_filepath = None
+        # close() analysis server'ı kapatmadan önce hâlâ çalışan kaybeden adayları bekler
+        self._candidates_running = 0
+        self._candidates_cond = threading.Condition()
+        # TEST aşaması için kalıcı analysis server; ilk testte başlatılır, close() ile kapanır
+        if self.config.get("analysis_server", True):
+            self.analysis_server = DartAnalysisServer(self.project_root)
+        else:
+            self.analysis_server = None
         
         # Output dizinini oluştur
         os.makedirs(os.path.join(self.project_root, self.output_dir), exist_ok=True)
@@ -42,13 +72,27 @@ class EliteFSMRunner:
             "max_retries": 3,
             "auto_commit": False,
             "notify": False,
+            "fix_filter": True,
             "test_commands": [["flutter", "analyze"]]
         }
     
-    def generate_filename(self):
+    def generate_filename(self, candidate=None):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if candidate is not None:
+            # paralel adaylar aynı saniyede yazılır
+            return f"{self.file_prefix}{timestamp}_c{candidate}.dart"
         return f"{self.file_prefix}{timestamp}.dart"
     
+    def filter_code(self, code):
+        """fix_filter açıksa (temiz kod, None); çıktı Dart değilse (ham kod, hata) döner."""
+        if not self.fix_filter:
+            return code, None
+        cleaned, fell_back = clean_dart(code)
+        if fell_back:
+            # HelloBox geçerli Dart'tır, TEST'i geçer; yazılırsa istenen widget hiç üretilmeden SUCCESS olur
+            return code, NOT_DART_ERROR
+        return cleaned, None
+    
     def write_code_to_file(self, code, filename):
         filepath = os.path.join(self.project_root, self.output_dir, filename)
         try:
@@ -74,9 +118,116 @@ class EliteFSMRunner:
             return False, f"Dosya okuma hatası: {e}"
         
         # Test node ile test et
-        success, message = test_code(code, self.project_root)
+        success, message = test_code(code, self.project_root, analysis_server=self.analysis_server,
+                                     output_dir=self.output_dir)
         return success, message
     
+    def close(self):
+        with self._candidates_cond:
+            self._candidates_cond.wait_for(lambda: self._candidates_running == 0)
+        if self.analysis_server is not None:
+            self.analysis_server.close()
+    
+    @staticmethod
+    def _remove_file(filepath):
+        if filepath and os.path.exists(filepath):
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+    
+    def _code_and_test_candidate(self, task, index, retries, cancelled):
+        with self._candidates_cond:
+            self._candidates_running += 1
+        try:
+            return self._run_candidate(task, index, retries, cancelled)
+        finally:
+            with self._candidates_cond:
+                self._candidates_running -= 1
+                self._candidates_cond.notify_all()
+    
+    def _run_candidate(self, task, index, retries, cancelled):
+        # adaylar farklı sıcaklık/seed ile üretilir
+        temperature = min(1.0, 0.1 + 0.2 * index)
+        seed = retries * self.speculative_candidates + index
+        code = generate_code(task, use_cache=retries == 0, temperature=temperature, seed=seed)
+        if cancelled.is_set():
+            # başka aday kazandı; dosya yazılmaz, test edilmez
+            return None
+        code, reject = self.filter_code(code)
+        if reject:
+            return False, code, None, None, reject
+        filename = self.generate_filename(candidate=index)
+        filepath = self.write_code_to_file(code, filename)
+        if not filepath:
+            return False, code, filename, None, "Kod dosyaya yazılamadı"
+        if cancelled.is_set():
+            # yazarken başka aday kazandı; analiz başlatılmaz
+            self._remove_file(filepath)
+            return None
+        success, message = self.run_test_commands(filepath)
+        if cancelled.is_set():
+            # test sürerken runner devam etti; sonuç kullanılmayacak
+            self._remove_file(filepath)
+            return None
+        return success, code, filename, filepath, message
+    
+    def run_speculative(self, task, retries):
+        """K adayı paralel üretip test eder; ilk geçen aday döner, diğerleri iptal edilir/atılır."""
+        k = self.speculative_candidates
+        print(f"🔀 {k} aday paralel üretiliyor...")
+        pool = ThreadPoolExecutor(max_workers=k, thread_name_prefix="fsm_candidate")
+        cancelled = threading.Event()
+        # aday thread'leri açık CODE aşamasına token sayaçlarını yazabilsin diye context kopyalanır
+        futures = {
+            pool.submit(contextvars.copy_context().run, self._code_and_test_candidate, task, i, retries, cancelled): i
+            for i in range(k)
+        }
+        winner = None
+        failures = []
+        try:
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"💥 Aday #{index} hatası: {e}")
+                    failures.append((index, "", None, None, f"❌ Aday hatası: {e}"))
+                    continue
+                if result is None:
+                    continue
+                success, code, filename, filepath, message = result
+                if success:
+                    print(f"🏁 Aday #{index} testi geçti")
+                    winner = (code, filename, filepath, message)
+                    break
+                print(f"❌ Aday #{index} başarısız: {message}")
+                failures.append((index, code, filename, filepath, message))
+        finally:
+            # başlamamış adaylar iptal edilir; çalışanlar bir sonraki kontrol noktasında durur
+            cancelled.set()
+            winner_path = winner[2] if winner is not None else None
+
+            def discard(future):
+                # kazanan dışındaki her adayın dosyası silinir: başarısızlar, tüketilmemiş
+                # sonuçlar ve iptal kontrolünden hemen önce bitenler (geç bitenlerde de çalışır)
+                if future.cancelled() or future.exception() is not None:
+                    return
+                result = future.result()
+                if result is not None and result[3] != winner_path:
+                    self._remove_file(result[3])
+            for future in futures:
+                future.add_done_callback(discard)
+            pool.shutdown(wait=False, cancel_futures=True)
+        if winner is not None:
+            return True, winner
+        if not failures:
+            return False, ("", "", None, "❌ Hiç aday üretilemedi")
+        # FIX'e ilk adayın (en düşük sıcaklık) hatası gönderilir
+        failures.sort(key=lambda f: f[0])
+        _index, code, filename, filepath, message = failures[0]
+        return False, (code, filename, filepath, message)
+    
     def auto_commit_if_enabled(self, filename):
         if not self.auto_commit:
             return
@@ -119,7 +270,12 @@ class EliteFSMRunner:
         except Exception as e:
             print(f"⚠️  Bildirim hatası: {e}")
     
-    def run(self, user_prompt):
+    def run(self, user_prompt, resume=None, on_checkpoint=None):
+        """
+        resume: önceki checkpoint ({"state", plan, code, filename, filepath, last_error, retries});
+        on_checkpoint(state, data): her tamamlanan durumdan sonra sıradaki durumla çağrılır.
+        Görev başarılıysa True döner.
+        """
         print(f"🚀 Elite FSM Runner Başlatıldı")
         print(f"📁 Proje: {self.project_root}")
         print(f"📂 Çıktı: {self.output_dir}")
@@ -130,20 +286,73 @@ class EliteFSMRunner:
         retries = 0
         task, code, test_result = "", "", ""
         filename = ""
+        filepath = None
+        error_msg = ""
+        
+        if resume:
+            state = resume.get("state") or "PLAN"
+            task = resume.get("plan") or ""
+            code = resume.get("code") or ""
+            filename = resume.get("filename") or ""
+            filepath = resume.get("filepath")
+            error_msg = resume.get("last_error") or ""
+            retries = resume.get("retries") or 0
+            print(f"⏯️ Checkpoint'ten devam: {state} (retry {retries})")
+            if state == "TEST" and not (filepath and os.path.exists(filepath)):
+                # test edilecek dosya kaybolduysa checkpoint'teki koddan yeniden yazılır
+                filename = filename or self.generate_filename()
+                filepath = self.write_code_to_file(code, filename)
+        
+        def checkpoint(next_state):
+            if on_checkpoint is not None:
+                on_checkpoint(next_state, {
+                    "plan": task,
+                    "code": code,
+                    "filename": filename,
+                    "filepath": filepath,
+                    "last_error": error_msg,
+                    "retries": retries,
+                })
+        
+        tracer = StageTracer(user_prompt, enabled=self.trace)
         
         while True:
             print(f"\n🧭 Durum: {state}")
+            span = tracer.start(state, retries)
             
             if state == "PLAN":
                 print("📋 Görev planlanıyor...")
                 task = plan_task(user_prompt)
                 print(f"📋 Planlanan Görev:\n{task}")
                 state = "CODE"
+                checkpoint(state)
                 
+            elif state == "CODE" and self.speculative_candidates > 1:
+                print("💻 Kod üretiliyor (spekülatif)...")
+                success, (code, filename, filepath, message) = self.run_speculative(task, retries)
+                if success:
+                    print(f"💻 Kazanan Kod:\n{code}")
+                    print("✅ Test başarılı!")
+                    state = "SUCCESS"
+                else:
+                    error_msg = message
+                    print(f"❌ Tüm adaylar başarısız: {error_msg}")
+                    state = "FIX"
+                    checkpoint(state)
+                    
             elif state == "CODE":
                 print("💻 Kod üretiliyor...")
-                code = generate_code(task)
+                # retry'larda cache atlanır; aynı prompt aynı (hatalı) kodu döndürmesin
+                code = generate_code(task, use_cache=retries == 0)
                 print(f"💻 Üretilen Kod:\n{code}")
+                code, reject = self.filter_code(code)
+                if reject:
+                    error_msg = reject
+                    print(f"🧩 {error_msg}")
+                    state = "FIX"
+                    checkpoint(state)
+                    tracer.finish(span, state, retries)
+                    continue
                 
                 # Dosya adı oluştur
                 filename = self.generate_filename()
@@ -151,9 +360,11 @@ class EliteFSMRunner:
                 
                 if filepath:
                     state = "TEST"
+                    checkpoint(state)
                 else:
                     print("❌ Kod dosyaya yazılamadı")
-                    break
+                    tracer.finish(span, "FAILURE", retries)
+                    return False
                     
             elif state == "TEST":
                 print("🧪 Test ediliyor...")
@@ -165,6 +376,7 @@ class EliteFSMRunner:
                 else:
                     print(f"❌ Test başarısız: {error_msg}")
                     state = "FIX"
+                    checkpoint(state)
                     
             elif state == "FIX":
                 if retries < self.max_retries:
@@ -174,29 +386,52 @@ class EliteFSMRunner:
                     code = fix_code(code, error_msg)
                     print(f"🔧 Düzeltilen kod:\n{code}")
                     state = "CODE"
+                    checkpoint(state)
                 else:
                     print(f"❌ Max retry ({self.max_retries}) aşıldı")
                     state = "FAILURE"
                     
             elif state == "SUCCESS":
                 print("🎉 Görev başarıyla tamamlandı!")
+                self.last_filepath = filepath
                 self.auto_commit_if_enabled(filename)
                 self.notify_if_enabled(True, filename)
-                break
+                return True
                 
             elif state == "FAILURE":
                 print("💥 Görev başarısız!")
                 self.notify_if_enabled(False, filename)
-                break
+                return False
                 
             else:
                 print(f"❓ Bilinmeyen durum: {state}")
-                break
+                return False
+            
+            tracer.finish(span, state, retries)
 
-def fsm_run(user_prompt):
+def fsm_run(user_prompt, runner=None, resume=None, on_checkpoint=None):
+    """runner verilirse (ör. queue_runner) onun analysis server'ı paylaşılır ve kapatılmaz."""
+    if runner is not None:
+        return runner.run(user_prompt, resume=resume, on_checkpoint=on_checkpoint)
     runner = EliteFSMRunner()
-    runner.run(user_prompt)
+    try:
+        return runner.run(user_prompt, resume=resume, on_checkpoint=on_checkpoint)
+    finally:
+        runner.close()
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Elite FSM: PLAN → CODE → TEST → FIX")
+    parser.add_argument("--out", help="başarılıysa test edilmiş (fix_filter'dan geçmiş) kodu bu dosyaya da yaz")
+    args = parser.parse_args()
     user_input = input("📌 Görev Tanımı: ")
-    fsm_run(user_input)
\ No newline at end of file
+    runner = EliteFSMRunner()
+    try:
+        ok = runner.run(user_input)
+    finally:
+        runner.close()
+    if ok and args.out and runner.last_filepath:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        shutil.copyfile(runner.last_filepath, args.out)
+        print(f"📄 Kod kopyalandı: {args.out}")
+    sys.exit(0 if ok else 1)
\ No newline at end of file
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+FSM aşama izleme (PLAN / CODE / TEST / FIX).
+
+Her geçiş için duvar saati süresi, kullanılan model ve Ollama'nın
+prompt_eval_count / eval_count / eval_duration değerleri JSONL trace dosyasına yazılır.
+Node'lar LLM çağrısından sonra record_llm_usage() çağırır; değerler o anda açık olan
+aşama kaydına eklenir (contextvar ile, aday thread'lerine de taşınabilir).
+
+Özet:  python3 fsm_trace.py summary [--file logs/fsm_trace.jsonl]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import threading
+import contextvars
+from pathlib import Path
+
+TRACE_FILE = os.environ.get("FSM_TRACE_FILE", str(Path(__file__).resolve().parent / "logs" / "fsm_trace.jsonl"))
+TRACED_STATES = ("PLAN", "CODE", "TEST", "FIX")
+
+_current_span = contextvars.ContextVar("fsm_trace_span", default=None)
+_write_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, run_id: str, task: str, stage: str, retries: int):
+        self.run_id = run_id
+        self.task = task
+        self.stage = stage
+        self.retries = retries
+        self.started = time.monotonic()
+        self.models = []
+        self.prompt_eval_count = 0
+        self.eval_count = 0
+        self.eval_duration = 0
+        self.llm_calls = 0
+        self._lock = threading.Lock()
+        self._token = None
+
+    def add_usage(self, model: str, info: dict | None):
+        info = info or {}
+        with self._lock:
+            self.llm_calls += 1
+            if model not in self.models:
+                self.models.append(model)
+            self.prompt_eval_count += int(info.get("prompt_eval_count") or 0)
+            self.eval_count += int(info.get("eval_count") or 0)
+            self.eval_duration += int(info.get("eval_duration") or 0)
+
+
+class StageTracer:
+    """Bir FSM çalıştırmasının (tek görev) aşamalarını trace dosyasına yazar."""
+
+    def __init__(self, task: str, path: str = TRACE_FILE, enabled: bool = True):
+        self.task = task
+        self.path = path
+        self.enabled = enabled
+        self.run_id = uuid.uuid4().hex[:12]
+
+    def start(self, stage: str, retries: int) -> Span | None:
+        if not self.enabled or stage not in TRACED_STATES:
+            return None
+        span = Span(self.run_id, self.task, stage, retries)
+        span._token = _current_span.set(span)
+        return span
+
+    def finish(self, span: Span | None, next_state: str, retries: int | None = None):
+        if span is None:
+            return
+        _current_span.reset(span._token)
+        if retries is not None:
+            # FIX aşaması retry sayacını artırır; kayıt aşama sonundaki değeri taşır
+            span.retries = retries
+        record = {
+            "ts": time.time(),
+            "run_id": span.run_id,
+            "task": span.task,
+            "stage": span.stage,
+            "next": next_state,
+            "retries": span.retries,
+            "seconds": round(time.monotonic() - span.started, 3),
+            "model": ",".join(span.models) or None,
+            "llm_calls": span.llm_calls,
+            "prompt_eval_count": span.prompt_eval_count,
+            "eval_count": span.eval_count,
+            # Ollama nanosaniye döner
+            "eval_duration": span.eval_duration,
+        }
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # tek write + O_APPEND: paralel worker süreçleri satırları karıştırmaz
+            with _write_lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            print(f"⚠️ Trace yazılamadı: {e}")
+
+
+def record_llm_usage(model: str, info: dict | None):
+    """Node'lar LLM yanıtından sonra çağırır; açık aşama yoksa sessizce yok sayılır."""
+    span = _current_span.get()
+    if span is not None:
+        span.add_usage(model, info)
+
+
+# === ÖZET ===
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def load_records(path: str = TRACE_FILE) -> list[dict]:
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def summarize(records: list[dict]) -> str:
+    lines = []
+    lines.append(f"{'stage':<6} {'n':>5} {'p50(s)':>8} {'p95(s)':>8} {'llm p50':>8} {'llm p95':>8} {'tok/s':>7}")
+    for stage in TRACED_STATES:
+        rows = [r for r in records if r.get("stage") == stage]
+        if not rows:
+            continue
+        wall = [r["seconds"] for r in rows]
+        llm = [r.get("eval_duration", 0) / 1e9 for r in rows]
+        tokens = sum(r.get("eval_count", 0) for r in rows)
+        eval_s = sum(llm)
+        rate = f"{tokens / eval_s:.1f}" if eval_s else "-"
+        lines.append(
+            f"{stage:<6} {len(rows):>5} {_percentile(wall, 50):>8.2f} {_percentile(wall, 95):>8.2f} "
+            f"{_percentile(llm, 50):>8.2f} {_percentile(llm, 95):>8.2f} {rate:>7}"
+        )
+    # görev başına retry: run_id içindeki en yüksek retries değeri
+    runs = {}
+    for r in records:
+        runs[r["run_id"]] = max(runs.get(r["run_id"], 0), r.get("retries", 0))
+    if runs:
+        retries = list(runs.values())
+        lines.append("")
+        lines.append(
+            f"görev: {len(runs)}, retry ortalama {sum(retries) / len(retries):.2f}, "
+            f"p95 {_percentile(retries, 95):.1f}, en fazla {max(retries)}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="FSM trace özeti")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_sum = sub.add_parser("summary", help="aşama başına p50/p95 ve görev başına retry")
+    p_sum.add_argument("--file", default=TRACE_FILE, help="trace JSONL dosyası")
+    args = parser.parse_args(argv)
+    try:
+        records = load_records(args.file)
+    except FileNotFoundError:
+        print(f"❌ Trace dosyası bulunamadı: {args.file}", file=sys.stderr)
+        return 1
+    if not records:
+        print("📭 Trace boş")
+        return 0
+    print(summarize(records))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
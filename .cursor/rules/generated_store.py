@@ -0,0 +1,120 @@
+"""
+Görev üretilmiş sprint satırlarının kalıcı indeksi (SQLite) - agent_auto.py için.
+
+Her yeni satır için tek bir INSERT yapılır (tüm kümeyi yeniden yazmak yerine).
+Satır görev kuyruğa girerken "queued" olarak sahiplenilir, görev bitince "done" olur;
+iptal edilen veya sahibi ölmüş süreçte kalan satırlar tekrar üretilebilir.
+WAL modu ve INSERT OR IGNORE sayesinde aynı dizinde çalışan birden fazla
+agent_auto süreci aynı satırı iki kez işlemez.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+STATUS_QUEUED = "queued"
+STATUS_DONE = "done"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS generated_lines (
+    key TEXT PRIMARY KEY,
+    line TEXT,
+    status TEXT NOT NULL,
+    owner INTEGER,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def _pid_alive(pid: int | None) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class GeneratedLineStore:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        # worker callback'leri farklı thread'lerden yazar (kilit ile)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(SCHEMA)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT status, owner FROM generated_lines WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False
+        status, owner = row
+        return status == STATUS_DONE or _pid_alive(owner)
+
+    def claim(self, key: str, line: str = "") -> bool:
+        """Satırı bu süreç adına sahiplenir; başka biri üretmiş/işliyorsa False."""
+        now = time.time()
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO generated_lines (key, line, status, owner, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (key, line, STATUS_QUEUED, self._pid, now),
+            )
+            if cur.rowcount:
+                return True
+            row = self._conn.execute("SELECT status, owner FROM generated_lines WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] == STATUS_DONE or _pid_alive(row[1]):
+                return False
+            # sahibi ölmüş (çökme/kill) kuyrukta kalmış satır devralınır
+            cur = self._conn.execute(
+                "UPDATE generated_lines SET owner = ?, updated_at = ? WHERE key = ? AND status = ? AND owner = ?",
+                (self._pid, now, key, STATUS_QUEUED, row[1]),
+            )
+            return cur.rowcount == 1
+
+    def mark_done(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE generated_lines SET status = ?, updated_at = ? WHERE key = ?",
+                (STATUS_DONE, time.time(), key),
+            )
+
+    def release(self, key: str):
+        """İptal edilen görevin sahipliğini bırakır; satır sonraki taramada yeniden üretilir."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM generated_lines WHERE key = ? AND status = ? AND owner = ?",
+                (key, STATUS_QUEUED, self._pid),
+            )
+
+    def import_json(self, path: str) -> int:
+        """Eski generated_lines.json içeriğini bir kez aktarır ve dosyayı .migrated olarak yeniden adlandırır."""
+        if not os.path.exists(path):
+            return 0
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        keys = data if isinstance(data, list) else []
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO generated_lines (key, line, status, owner, updated_at) VALUES (?, '', ?, NULL, ?)",
+                [(k, STATUS_DONE, now) for k in keys],
+            )
+        os.replace(path, path + ".migrated")
+        return len(keys)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM generated_lines WHERE status = ?", (STATUS_DONE,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
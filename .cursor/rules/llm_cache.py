@@ -0,0 +1,216 @@
+"""
+İçerik adresli, diskte tutulan LLM yanıt cache'i.
+
+Anahtar: sha256(model, prompt, seçenekler). Aynı prompt'u tekrar gönderen yollar
+(sprint yeniden çalıştırma, task_queue.txt tekrarı, çökme sonrası retry) GPU'ya gitmez.
+- boyut sınırı aşılınca en az yakın zamanda kullanılan kayıtlar silinir (LRU, mtime ile)
+- TTL'i geçen kayıt okunmaz ve silinir
+- toplam boyut bellekte tutulur; dizin yalnızca sınır aşılınca veya LLM_CACHE_SWEEP_INTERVAL'de
+  bir taranır (başka süreçlerin yazdıklarını ve dokunulmamış bayat kayıtları da yakalar)
+- LLM_CACHE_DISABLE=1 veya bypass=True ile cache atlanır
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+CACHE_DIR = os.environ.get("LLM_CACHE_DIR", str(Path(__file__).resolve().parent / "logs" / "llm_cache"))
+CACHE_MAX_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_DISABLED = os.environ.get("LLM_CACHE_DISABLE", "0") == "1"
+SWEEP_INTERVAL = float(os.environ.get("LLM_CACHE_SWEEP_INTERVAL", "600"))
+# sınır aşılınca toplam bu orana inene kadar silinir
+EVICT_TO = 0.9
+
+
+def cache_key(model: str, prompt: str, options: dict | None = None) -> str:
+    material = json.dumps(
+        {"model": model, "prompt": prompt, "options": options or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    # alt sınıflar (ör. şifreli summary_cache) anahtar türetmeyi ve disk biçimini değiştirebilir
+    SUFFIX = ".json"
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 ttl: int = CACHE_TTL_SECONDS, disabled: bool = CACHE_DISABLED):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disabled = disabled
+        self._evict_lock = threading.Lock()
+        # bilinen toplam bayt (None: henüz taranmadı) ve son tam tarama anı
+        self._total = None
+        self._last_sweep = 0.0
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _key(self, model: str, prompt: str, options: dict | None) -> str:
+        return cache_key(model, prompt, options)
+
+    def _encode(self, entry: dict) -> bytes:
+        return json.dumps(entry, ensure_ascii=False).encode("utf-8")
+
+    def _decode(self, data: bytes) -> dict:
+        return json.loads(data)
+
+    def _path(self, key: str) -> str:
+        # ilk iki hex karakteri alt klasör: tek dizinde binlerce dosya birikmez
+        return os.path.join(self.directory, key[:2], f"{key}{self.SUFFIX}")
+
+    def _count(self, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def get(self, model: str, prompt: str, options: dict | None = None, bypass: bool = False):
+        """Kayıtlı yanıtı döner; yoksa, süresi dolmuşsa veya bypass ise None."""
+        if self.disabled or bypass:
+            return None
+        path = self._path(self._key(model, prompt, options))
+        try:
+            with open(path, "rb") as f:
+                entry = self._decode(f.read())
+        except (FileNotFoundError, ValueError):
+            self._count(False)
+            return None
+        if self.ttl and time.time() - entry.get("created", 0) > self.ttl:
+            self._discard(path)
+            self._count(False)
+            return None
+        self._count(True)
+        try:
+            # LRU: son kullanım zamanı mtime olarak tutulur
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def put(self, model: str, prompt: str, value, options: dict | None = None, bypass: bool = False):
+        if self.disabled or bypass:
+            return
+        path = self._path(self._key(model, prompt, options))
+        dirpath = os.path.dirname(path)
+        os.makedirs(dirpath, exist_ok=True)
+        data = self._encode({"model": model, "created": time.time(), "value": value})
+        fd, tmp_path = tempfile.mkstemp(dir=dirpath, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            try:
+                replaced = os.stat(path).st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._account(len(data) - replaced)
+        self._maybe_evict()
+
+    def get_or_call(self, model: str, prompt: str, call, options: dict | None = None, bypass: bool = False):
+        """Cache'te varsa onu, yoksa call() sonucunu döner ve kaydeder."""
+        cached = self.get(model, prompt, options, bypass=bypass)
+        if cached is not None:
+            return cached
+        value = call()
+        if value:
+            self.put(model, prompt, value, options, bypass=bypass)
+        return value
+
+    def _account(self, delta: int):
+        with self._evict_lock:
+            if self._total is not None:
+                self._total += delta
+
+    def _discard(self, path: str):
+        try:
+            size = os.stat(path).st_size
+            os.remove(path)
+        except OSError:
+            return
+        self._account(-size)
+
+    def _maybe_evict(self):
+        # put() başına tam tarama yok: yalnızca sınır aşıldıysa, toplam bilinmiyorsa veya süre dolduysa
+        with self._evict_lock:
+            over = self._total is None or self._total > self.max_bytes
+            stale = time.monotonic() - self._last_sweep > SWEEP_INTERVAL
+        if over or stale:
+            self._evict()
+
+    def _evict(self):
+        with self._evict_lock:
+            entries = []
+            total = 0
+            now = time.time()
+            for root, _dirs, files in os.walk(self.directory):
+                for name in files:
+                    if not name.endswith(self.SUFFIX):
+                        continue
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    # mtime her okunmada yenilenir; TTL'den uzun süredir dokunulmamışsa kesin bayat
+                    if self.ttl and now - st.st_mtime > self.ttl:
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+                    total += st.st_size
+            self._last_sweep = time.monotonic()
+            if total > self.max_bytes:
+                # sınırın biraz altına inilir; doluyken her put() yeniden taramasın
+                target = self.max_bytes * EVICT_TO
+                entries.sort()
+                for _mtime, size, path in entries:
+                    if total <= target:
+                        break
+                    try:
+                        os.remove(path)
+                        total -= size
+                    except OSError:
+                        pass
+            self._total = total
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache:
+    """Süreç-genel paylaşılan cache (ilk çağrıda oluşturulur)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
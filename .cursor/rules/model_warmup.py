@@ -0,0 +1,197 @@
+"""
+Model ısındırma ve keep_alive yönetimi (agent_auto.py için).
+
+Router'ın seçebileceği tüm modeller başlangıçta boş prompt ile yüklenir (Ollama'da
+boş prompt yalnızca modeli belleğe alır) ve model başına keep_alive süresi gönderilir.
+Hangi modelin bellekte olduğu ve ne zaman düşeceği takip edilir; arka plan thread'i
+hâlâ bellekte olan modelleri süre dolmadan yeniler. /api/ps ile başka bir modelin yer
+açmak için attığı modeller fark edilir ama geri yüklenmez: tek GPU'da bu, o an kullanılan
+modeli atıp model değişimini artırır; atılan model ilk gerçek çağrıda yüklenir.
+
+- OLLAMA_KEEP_ALIVE: varsayılan süre ("30m", "1h", "900", "-1" = sürekli)
+  birimsiz sayılar Ollama'ya JSON sayısı (saniye) olarak gider; metin hâli Go
+  time.ParseDuration'da birimsiz olduğu için reddedilir
+- OLLAMA_KEEP_ALIVE_MODELS: model başına süre ("llama3:latest=10m,deepseek-coder:latest=1h")
+- OLLAMA_WARM_MARGIN: süre dolmadan kaç saniye önce yenilenir
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+
+from ollama_client import get_client
+
+KEEP_ALIVE_DEFAULT = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+KEEP_ALIVE_MODELS = os.environ.get("OLLAMA_KEEP_ALIVE_MODELS", "")
+REFRESH_MARGIN = float(os.environ.get("OLLAMA_WARM_MARGIN", "60"))
+# /api/ps ile bellekteki modellerin kontrol aralığı
+CHECK_INTERVAL = float(os.environ.get("OLLAMA_WARM_CHECK_INTERVAL", "30"))
+# büyük modellerin diskten yüklenmesi dakikalar sürebilir
+WARM_TIMEOUT = int(os.environ.get("OLLAMA_WARM_TIMEOUT", "300"))
+
+DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+logger = logging.getLogger("agent_auto")
+
+
+def parse_keep_alive(value) -> float | None:
+    """Ollama keep_alive değerini saniyeye çevirir; negatif (sürekli bellekte) için None."""
+    text = str(value).strip()
+    try:
+        seconds = float(text)
+    except ValueError:
+        parts = DURATION_RE.findall(text)
+        if not parts or "".join(n + u for n, u in parts) != text.lstrip("-"):
+            raise ValueError(f"Geçersiz keep_alive: {value!r}")
+        seconds = sum(float(n) * DURATION_UNITS[u] for n, u in parts)
+        if text.startswith("-"):
+            seconds = -seconds
+    return None if seconds < 0 else seconds
+
+
+def keep_alive_payload(value):
+    """İstek gövdesindeki keep_alive: birimsiz sayılar int/float, süre metinleri ("30m") olduğu gibi."""
+    text = str(value).strip()
+    try:
+        number = float(text)
+    except ValueError:
+        return text
+    return int(number) if number.is_integer() else number
+
+
+def parse_model_overrides(spec: str) -> dict[str, str]:
+    overrides = {}
+    for item in spec.split(","):
+        if "=" in item:
+            model, value = item.split("=", 1)
+            overrides[model.strip()] = value.strip()
+    return overrides
+
+
+class ModelWarmer:
+    def __init__(self, endpoint: str, models, keep_alive: str = KEEP_ALIVE_DEFAULT,
+                 overrides: dict[str, str] | None = None, margin: float = REFRESH_MARGIN,
+                 check_interval: float = CHECK_INTERVAL):
+        self.endpoint = endpoint
+        self.ps_url = endpoint.rsplit("/api/", 1)[0] + "/api/ps"
+        self.models = list(models)
+        self.keep_alive = keep_alive
+        self.overrides = overrides if overrides is not None else parse_model_overrides(KEEP_ALIVE_MODELS)
+        self.margin = margin
+        self.check_interval = check_interval
+        # model -> bellekten düşeceği an (monotonic); None = süresiz
+        self.resident = {}
+        self.missing = set()
+        self._ps_supported = True
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def keep_alive_for(self, model: str) -> int | float | str:
+        """Ollama'ya gönderilecek biçimde (bkz. keep_alive_payload) model başına keep_alive."""
+        return keep_alive_payload(self.overrides.get(model, self.keep_alive))
+
+    def is_resident(self, model: str) -> bool:
+        with self._lock:
+            if model not in self.resident:
+                return False
+            expires = self.resident[model]
+            return expires is None or expires > time.monotonic()
+
+    def touch(self, model: str):
+        """Gerçek bir çağrı keep_alive ile yapıldıysa bellekte kalma süresi baştan başlar."""
+        seconds = parse_keep_alive(self.keep_alive_for(model))
+        with self._lock:
+            if seconds == 0:
+                self.resident.pop(model, None)
+            else:
+                self.resident[model] = None if seconds is None else time.monotonic() + seconds
+
+    def warm(self, model: str) -> bool:
+        payload = {"model": model, "prompt": "", "stream": False, "keep_alive": self.keep_alive_for(model)}
+        started = time.monotonic()
+        try:
+            r = get_client().post(self.endpoint, payload, timeout=WARM_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"🔥 {model} ısındırılamadı: {e}")
+            return False
+        if r.status_code == 404:
+            logger.warning(f"🔥 {model} bulunamadı, ısındırma atlanıyor.")
+            with self._lock:
+                self.missing.add(model)
+            return False
+        if not r.ok:
+            logger.warning(f"🔥 {model} ısındırma başarısız: status {r.status_code}")
+            return False
+        self.touch(model)
+        logger.info(f"🔥 {model} bellekte ({time.monotonic() - started:.1f}s, keep_alive={self.keep_alive_for(model)})")
+        return True
+
+    def warm_all(self) -> list[str]:
+        """Modelleri sırayla yükler (aynı anda yüklemek GPU'da yalnızca birbirini bekletir)."""
+        return [m for m in self.models if m not in self.missing and self.warm(m)]
+
+    def sync_with_server(self):
+        """/api/ps'de görünmeyen modelleri (yer açmak için atılmış) soğuk olarak işaretler."""
+        if not self._ps_supported:
+            return
+        try:
+            r = get_client().get(self.ps_url, timeout=5)
+        except Exception:
+            return
+        if r.status_code == 404:
+            # eski Ollama sürümleri /api/ps sunmaz; yalnızca yerel süre takibi kullanılır
+            self._ps_supported = False
+            return
+        if not r.ok:
+            return
+        loaded = {m.get("name") or m.get("model") for m in r.json().get("models", [])}
+        with self._lock:
+            for model in list(self.resident):
+                if model not in loaded:
+                    # geri yüklenmez; ilk gerçek çağrı modeli yükler ve touch() ile yeniden izlenir
+                    logger.info(f"❄️ {model} bellekten düşmüş, kullanıldığında yüklenecek.")
+                    del self.resident[model]
+
+    def _due(self) -> list[str]:
+        """Yalnızca hâlâ bellekte olup süresi dolmak üzere olan modeller (yenileme yükleme yapmaz)."""
+        now = time.monotonic()
+        with self._lock:
+            due = []
+            for model, expires in self.resident.items():
+                if model in self.missing or parse_keep_alive(self.keep_alive_for(model)) == 0:
+                    continue
+                if expires is not None and expires - now <= self.margin:
+                    due.append(model)
+            return due
+
+    def _next_wakeup(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            deadlines = [e - self.margin - now for e in self.resident.values() if e is not None]
+        return max(1.0, min([self.check_interval] + deadlines))
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self._next_wakeup()):
+            self.sync_with_server()
+            for model in self._due():
+                if self._stop.is_set():
+                    break
+                # sync ile yenileme arasında atılmış olabilir; o durumda yüklemeye sebep olma
+                if self.is_resident(model):
+                    self.warm(model)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refresh_loop, name="model_warmer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,173 @@
+import os
+import json
+import queue
+import threading
+import subprocess
+
+"""
+Long-lived Dart analysis server for the TEST stage.
+- Started once (per EliteFSMRunner / queue run), keeps the project model warm
+- Pushes candidate files as overlays (analysis.updateContent) and reads errors back
+- Any crash/timeout raises AnalysisServerError; callers fall back to the subprocess chain
+"""
+
+SERVER_CMD = ["dart", "language-server", "--protocol=analyzer"]
+# ilk getErrors tüm projeyi analiz ettiği için uzun sürebilir
+REQUEST_TIMEOUT = float(os.environ.get("FSM_ANALYSIS_TIMEOUT", "120"))
+# art arda bu kadar çöküşten sonra sunucu bu çalıştırma için devre dışı kalır
+MAX_RESTARTS = int(os.environ.get("FSM_ANALYSIS_MAX_RESTARTS", "2"))
+
+
+class AnalysisServerError(Exception):
+    pass
+
+
+class DartAnalysisServer:
+    def __init__(self, project_root: str, env=None):
+        self.project_root = os.path.abspath(project_root)
+        self.env = env
+        self.proc = None
+        self.restarts = 0
+        self.disabled = False
+        self._next_id = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._request_lock = threading.Lock()
+
+    # === LIFECYCLE ===
+
+    def start(self):
+        if self.disabled:
+            raise AnalysisServerError("analysis server devre dışı")
+        try:
+            self.proc = subprocess.Popen(
+                SERVER_CMD,
+                cwd=self.project_root,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                encoding="utf-8",
+                env=self.env,
+                bufsize=1,
+            )
+        except OSError as e:
+            # dart yoksa tekrar denemenin anlamı yok
+            self.disabled = True
+            raise AnalysisServerError(f"analysis server başlatılamadı: {e}")
+        threading.Thread(target=self._read_loop, args=(self.proc,), daemon=True).start()
+        self._request("analysis.setAnalysisRoots", {"included": [self.project_root], "excluded": []})
+        print(f"🛰️ Analysis server başlatıldı (pid={self.proc.pid})")
+
+    def close(self):
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            self._send(proc, "server.shutdown", {})
+            proc.wait(timeout=5)
+        except Exception:
+            proc.kill()
+        self._fail_pending("analysis server kapatıldı")
+
+    def _restart(self):
+        self.close()
+        if self.disabled:
+            return
+        self.restarts += 1
+        if self.restarts > MAX_RESTARTS:
+            self.disabled = True
+            print(f"⚠️ Analysis server {MAX_RESTARTS} kez çöktü, subprocess analizine dönülüyor")
+            return
+        print(f"🔁 Analysis server yeniden başlatılacak ({self.restarts}/{MAX_RESTARTS})")
+
+    def _ensure_running(self):
+        if self.proc is None or self.proc.poll() is not None:
+            self.proc = None
+            self.start()
+
+    # === PROTOCOL ===
+
+    def _read_loop(self, proc):
+        for line in proc.stdout:
+            line = line.strip()
+            if not line.startswith("{"):
+                continue
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            # notification'lar (server.connected, analysis.errors, ...) id taşımaz
+            if "id" not in msg:
+                continue
+            with self._lock:
+                slot = self._pending.pop(msg["id"], None)
+            if slot is not None:
+                slot.put(msg)
+        # yeniden başlatılmış sürecin bekleyen isteklerine dokunma
+        if proc is self.proc:
+            self._fail_pending("analysis server süreci sonlandı")
+
+    def _fail_pending(self, reason: str):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for slot in pending.values():
+            slot.put({"error": {"message": reason}})
+
+    def _send(self, proc, method: str, params: dict) -> str:
+        with self._lock:
+            self._next_id += 1
+            req_id = str(self._next_id)
+        proc.stdin.write(json.dumps({"id": req_id, "method": method, "params": params}) + "\n")
+        proc.stdin.flush()
+        return req_id
+
+    def _request(self, method: str, params: dict, timeout: float = REQUEST_TIMEOUT) -> dict:
+        proc = self.proc
+        if proc is None:
+            raise AnalysisServerError("analysis server çalışmıyor")
+        slot = queue.Queue(maxsize=1)
+        with self._lock:
+            self._next_id += 1
+            req_id = str(self._next_id)
+            self._pending[req_id] = slot
+        try:
+            proc.stdin.write(json.dumps({"id": req_id, "method": method, "params": params}) + "\n")
+            proc.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise AnalysisServerError(f"{method} gönderilemedi: {e}")
+        try:
+            msg = slot.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._pending.pop(req_id, None)
+            raise AnalysisServerError(f"{method} zaman aşımı ({timeout}s)")
+        if msg.get("error"):
+            raise AnalysisServerError(f"{method} hatası: {msg['error'].get('message')}")
+        return msg.get("result", {})
+
+    # === API ===
+
+    def analyze_file(self, fpath: str, content: str) -> list[dict]:
+        """Aday dosyayı overlay olarak gönderir ve o dosyanın teşhislerini döner."""
+        fpath = os.path.abspath(fpath)
+        with self._request_lock:
+            try:
+                self._ensure_running()
+                self._request("analysis.updateContent", {"files": {fpath: {"type": "add", "content": content}}})
+                result = self._request("analysis.getErrors", {"file": fpath})
+                # dosya diske de yazıldı; overlay'i bırakmak belleği şişirmez
+                self._request("analysis.updateContent", {"files": {fpath: {"type": "remove"}}})
+            except AnalysisServerError:
+                self._restart()
+                raise
+            self.restarts = 0
+        return result.get("errors", [])
+
+
+def format_diagnostic(error: dict) -> str:
+    loc = error.get("location", {})
+    return (
+        f"{error.get('severity', '').lower()} {loc.get('startLine')}:{loc.get('startColumn')} "
+        f"{error.get('message', '')} ({error.get('code', '')})"
+    )
@@ -1,4 +1,6 @@
 from langchain_ollama import ChatOllama
+from llm_cache import get_cache
+from fsm_trace import record_llm_usage
 
 SYSTEM_POLICY = """Sen bir Flutter uzmanısın. Aşağıdaki kuralları KESİNLİKLE takip et:
 
@@ -44,20 +46,39 @@ class WidgetName extends StatelessWidget {
 
 ŞİMDİ SADECE DART KODU YAZ:"""
 
-def generate_code(plan_text: str) -> str:
-    llm = ChatOllama(
-        model="deepseek-coder", 
-        temperature=0.1,
-        # Stop sequences ekle
-        stop=["Bu", "Bu kod", "Açıklama", "Yorum", "Not", "Örnek"]
-    )
-    
-    prompt = f"{SYSTEM_POLICY}\n\nGörev: {plan_text.strip()}\n\nŞimdi sadece Dart kodu yaz:"
+CODE_MODEL = "deepseek-coder"
+CODE_OPTIONS = {
+    "temperature": 0.1,
+    # Stop sequences ekle
+    "stop": ["Bu", "Bu kod", "Açıklama", "Yorum", "Not", "Örnek"],
+}
+
+def _invoke(prompt: str, options: dict) -> str:
+    llm = ChatOllama(model=CODE_MODEL, **options)
     
     response = llm.invoke(prompt)
+    record_llm_usage(CODE_MODEL, getattr(response, "response_metadata", None))
     
     # AIMessage'ı string'e çevir
     if hasattr(response, 'content'):
         return str(response.content)
     else:
-        return str(response) 
\ No newline at end of file
+        return str(response)
+
+def generate_code(plan_text: str, use_cache: bool = True, temperature: float | None = None,
+                  seed: int | None = None) -> str:
+    """temperature/seed: spekülatif modda adaylar arasında çeşitlilik için."""
+    prompt = f"{SYSTEM_POLICY}\n\nGörev: {plan_text.strip()}\n\nŞimdi sadece Dart kodu yaz:"
+    options = dict(CODE_OPTIONS)
+    if temperature is not None:
+        options["temperature"] = temperature
+    if seed is not None:
+        options["seed"] = seed
+    
+    return get_cache().get_or_call(
+        CODE_MODEL,
+        prompt,
+        lambda: _invoke(prompt, options),
+        options=options,
+        bypass=not use_cache,
+    )
@@ -1,7 +1,10 @@
 from langchain_ollama import OllamaLLM
+from fsm_trace import record_llm_usage
+
+FIX_MODEL = "deepseek-coder:latest"
 
 def fix_code(code, error_message):
-    llm = OllamaLLM(model="deepseek-coder:latest")
+    llm = OllamaLLM(model=FIX_MODEL)
     
     prompt = f"""Sen bir Flutter kod düzelticisisin. Aşağıdaki hatayı düzelt:
 
@@ -21,5 +24,7 @@ KURALLAR:
 
 DÜZELTİLMİŞ KOD:"""
 
-    response = llm.invoke(prompt)
-    return response
+    result = llm.generate([prompt])
+    generation = result.generations[0][0]
+    record_llm_usage(FIX_MODEL, generation.generation_info)
+    return generation.text
@@ -1,11 +1,26 @@
 from langchain_ollama import OllamaLLM
+from llm_cache import get_cache
+from fsm_trace import record_llm_usage
 
-def plan_task(input_text):
-    llm = OllamaLLM(model="mistral:latest")
+PLAN_MODEL = "mistral:latest"
+
+def _invoke(prompt):
+    # generate(): metin + Ollama sayaçları (eval_count, eval_duration, ...)
+    result = OllamaLLM(model=PLAN_MODEL).generate([prompt])
+    generation = result.generations[0][0]
+    record_llm_usage(PLAN_MODEL, generation.generation_info)
+    return generation.text
+
+def plan_task(input_text, use_cache=True):
     prompt = f"""Bu Flutter görevini basit adımlara böl:
 
 GÖREV: {input_text}
 
 Sadece 2-3 ana adım yaz, çok detaylı olmasın:"""
     
-    return llm.invoke(prompt) 
\ No newline at end of file
+    return get_cache().get_or_call(
+        PLAN_MODEL,
+        prompt,
+        lambda: _invoke(prompt),
+        bypass=not use_cache,
+    )
@@ -3,14 +3,28 @@ import re
 import json
 import uuid
 import subprocess
+from nodes.analysis_server import DartAnalysisServer, AnalysisServerError, format_diagnostic
 
 """
 Production-grade test node for Flutter projects.
 - Writes code under project_root/output_dir
 - Ensures valid Dart file by wrapping bare widget snippets
 - Runs formatter, then analyzer with robust fallbacks
+- Same verdict for every analyzer: the candidate fails only on error-severity
+  diagnostics in its own file; warnings/infos pass
+- Formats/analyzes only the candidate file and its local imports, not the whole project
 """
 
+# import 'x.dart'; export '...'; part '...';
+DART_DIRECTIVE_RE = re.compile(r"""^\s*(?:import|export|part)\s+['"]([^'"]+)['"]""", re.MULTILINE)
+# flutter analyze:  error • Message • lib/a.dart:3:5 • code
+FLUTTER_DIAG_RE = re.compile(r"^\s*(error|warning|info)\s+•\s+(.+?)\s+•\s+(\S+?):(\d+):(\d+)\s+•\s+(\S+)\s*$", re.MULTILINE)
+# dart analyze:  error - lib/a.dart:3:5 - Message - code
+DART_DIAG_RE = re.compile(r"^\s*(error|warning|info)\s+-\s+(\S+?):(\d+):(\d+)\s+-\s+(.+?)\s+-\s+(\S+)\s*$", re.MULTILINE)
+# dependency taraması için üst sınır (döngüsel/çok büyük import ağaçlarına karşı)
+MAX_DEPENDENCY_FILES = 50
+MAX_REPORTED_DIAGNOSTICS = 20
+
 WRAPPER_TEMPLATE = """
 import 'package:flutter/material.dart';
 
@@ -54,14 +68,116 @@ def _wrap_if_needed(source: str) -> str:
     wrapped = WRAPPER_TEMPLATE.replace('{WIDGET_CODE}', snippet)
     return wrapped
 
-def test_code(code: str, project_root="/Users/caglarilhan/psyclinicai") -> tuple[bool, str]:
+def _package_name(project_root: str) -> str | None:
+    try:
+        with open(os.path.join(project_root, "pubspec.yaml"), "r", encoding="utf-8") as f:
+            for line in f:
+                m = re.match(r"^name:\s*(\S+)", line)
+                if m:
+                    return m.group(1)
+    except OSError:
+        pass
+    return None
+
+def _local_dependencies(fpath: str, project_root: str) -> list[str]:
+    """Aday dosya + projedeki yerel import ağacı (relative ve package:<proje>/ import'ları)."""
+    package = _package_name(project_root)
+    lib_dir = os.path.join(project_root, "lib")
+    seen = [os.path.abspath(fpath)]
+    queue = list(seen)
+    while queue and len(seen) < MAX_DEPENDENCY_FILES:
+        current = queue.pop(0)
+        try:
+            with open(current, "r", encoding="utf-8") as f:
+                source = f.read()
+        except OSError:
+            continue
+        for uri in DART_DIRECTIVE_RE.findall(source):
+            if uri.startswith("dart:"):
+                continue
+            if uri.startswith("package:"):
+                if not package or not uri.startswith(f"package:{package}/"):
+                    continue
+                dep = os.path.join(lib_dir, uri[len(f"package:{package}/"):])
+            else:
+                dep = os.path.join(os.path.dirname(current), uri)
+            dep = os.path.abspath(dep)
+            if dep not in seen and os.path.isfile(dep):
+                seen.append(dep)
+                queue.append(dep)
+    return seen
+
+def _file_diagnostics(output: str, fpath: str, project_root: str) -> list[str]:
+    """Analyzer çıktısından yalnızca aday dosyaya ait teşhisleri ayıklar."""
+    target = os.path.abspath(fpath)
+    diags = []
+    for m in FLUTTER_DIAG_RE.finditer(output):
+        severity, message, path, line, col, code = m.groups()
+        if os.path.abspath(os.path.join(project_root, path)) == target:
+            diags.append(f"{severity} {line}:{col} {message} ({code})")
+    for m in DART_DIAG_RE.finditer(output):
+        severity, path, line, col, message, code = m.groups()
+        if os.path.abspath(os.path.join(project_root, path)) == target:
+            diags.append(f"{severity} {line}:{col} {message} ({code})")
+    return diags
+
+def _has_diagnostics(output: str) -> bool:
+    """Analyzer gerçekten çalışıp teşhis listesi bastı mı (araç yok / çöktü ayrımı için)."""
+    return bool(FLUTTER_DIAG_RE.search(output) or DART_DIAG_RE.search(output))
+
+def _verdict(diagnostics: list[str], source: str) -> tuple[bool, str]:
+    """Server ve subprocess için ortak karar: aday dosyada error varsa başarısız."""
+    if not diagnostics:
+        return True, f"✅ Test başarılı: {source}"
+    if not any(d.startswith("error ") for d in diagnostics):
+        return True, f"⚠️ Test geçti (sadece warning): {source}"
+    details = "\n".join(diagnostics[:MAX_REPORTED_DIAGNOSTICS])
+    return False, f"❌ Analyzer hataları\n{details}"
+
+def _analyze_with_subprocess(fpath: str, project_root: str, env) -> tuple[bool, str]:
+    # Sadece aday dosya ve yerel bağımlılıkları (tüm proje değil)
+    targets = [os.path.relpath(p, project_root) for p in _local_dependencies(fpath, project_root)]
+
+    # Try `flutter analyze` first, then dart analyze, then no-fatal-warnings
+    cmds = [
+        ["flutter", "analyze", *targets],
+        ["dart", "analyze", *targets],
+        ["dart", "analyze", "--no-fatal-warnings", *targets],
+    ]
+    for cmd in cmds:
+        try:
+            rc, out, err = _run_cmd(cmd, cwd=project_root, env=env)
+            print(f"🔍 {' '.join(cmd)}: rc={rc}")
+            if rc == 0:
+                return True, f"✅ Test başarılı: {' '.join(cmd)}"
+            # teşhisler stdout'a basılır; teşhis yoksa araç çalışmamıştır, sıradakine geç
+            output = out + "\n" + err
+            if _has_diagnostics(output):
+                return _verdict(_file_diagnostics(output, fpath, project_root), " ".join(cmd))
+        except Exception as e:
+            print(f"💥 {cmd} hatası: {e}")
+            continue
+
+    return False, "❌ Tüm analyzer'lar başarısız"
+
+def _analyze_with_server(server: DartAnalysisServer, fpath: str) -> tuple[bool, str]:
+    # format sonrası diskteki hali overlay olarak gönderilir
+    with open(fpath, "r", encoding="utf-8") as f:
+        source = f.read()
+    errors = server.analyze_file(fpath, source)
+    print(f"🛰️ analysis server: {len(errors)} teşhis")
+    return _verdict([format_diagnostic(e) for e in errors], "analysis server")
+
+def test_code(code: str, project_root="/Users/caglarilhan/psyclinicai", analysis_server=None,
+              output_dir=None) -> tuple[bool, str]:
     try:
         # Load config
         with open("fsm_config_project.json", "r", encoding="utf-8") as f:
             cfg = json.load(f)
 
         project_root = cfg["project_root"]
-        out_dir = os.path.join(project_root, cfg["output_dir"])  # e.g., lib/widgets/generated
+        # output_dir: runner'ın (worker'a özel olabilen) çıktı dizini
+        out_dir = os.path.join(project_root, output_dir or cfg["output_dir"])  # e.g., lib/widgets/generated
         os.makedirs(out_dir, exist_ok=True)
 
         filename = f"{cfg.get('file_prefix','fsm_gen_')}{uuid.uuid4().hex[:8]}.dart"
@@ -79,35 +195,18 @@ def test_code(code: str, project_root="/Users/caglarilhan/psyclinicai") -> tuple
         env.setdefault("LC_ALL", "en_US.UTF-8")
         env.setdefault("LANG", "en_US.UTF-8")
 
-        # 1) Format (non-fatal)
-        rc_fmt, out_fmt, err_fmt = _run_cmd(["dart", "format", "lib"], cwd=project_root, env=env)
+        # 1) Format (non-fatal) - yalnızca aday dosya
+        rc_fmt, out_fmt, err_fmt = _run_cmd(["dart", "format", os.path.relpath(fpath, project_root)], cwd=project_root, env=env)
         print(f"🔧 Dart format: rc={rc_fmt}")
 
-        # 2) Analyze (robust fallbacks)
-        # Try `flutter analyze` first, then dart analyze, then no-fatal-warnings
-        cmds = [
-            ["flutter", "analyze"],
-            ["dart", "analyze"],
-            ["dart", "analyze", "--no-fatal-warnings"],
-        ]
-
-        for cmd in cmds:
+        # 2) Analyze: önce kalıcı analysis server, çökerse/zaman aşımında subprocess zinciri
+        if analysis_server is not None and not analysis_server.disabled:
             try:
-                rc, out, err = _run_cmd(cmd, cwd=project_root, env=env)
-                print(f"🔍 {' '.join(cmd)}: rc={rc}")
-                
-                if rc == 0:
-                    return True, f"✅ Test başarılı: {' '.join(cmd)}"
-                elif "no-fatal-warnings" in " ".join(cmd):
-                    # Sadece warning'ler varsa kabul et
-                    if "error" not in err.lower():
-                        return True, f"⚠️ Test geçti (sadece warning): {' '.join(cmd)}"
-                        
-            except Exception as e:
-                print(f"💥 {cmd} hatası: {e}")
-                continue
+                return _analyze_with_server(analysis_server, fpath)
+            except AnalysisServerError as e:
+                print(f"⚠️ Analysis server kullanılamadı, subprocess analizine dönülüyor: {e}")
 
-        return False, "❌ Tüm analyzer'lar başarısız"
+        return _analyze_with_subprocess(fpath, project_root, env)
         
     except Exception as e:
-        return False, f"❌ Test hatası: {e}" 
\ No newline at end of file
+        return False, f"❌ Test hatası: {e}"
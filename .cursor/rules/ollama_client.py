@@ -0,0 +1,91 @@
+"""
+Ortak Ollama HTTP istemcisi.
+
+agent_auto.py, scripts/goose_sprint_bridge.py ve scripts/functions/session_summary.py
+aynı süreç-genel istemciyi kullanır:
+- keep-alive bağlantı havuzu (her çağrıda yeni TCP bağlantısı açılmaz)
+- host başına bağlantı sınırı (havuz doluysa istek boş bağlantı bekler)
+- senkron (post/generate) ve asyncio (apost/agenerate) arayüzleri
+"""
+
+import os
+import json
+import asyncio
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# host başına açık tutulacak en fazla bağlantı
+MAX_CONNECTIONS_PER_HOST = int(os.environ.get("OLLAMA_MAX_CONNECTIONS", "8"))
+# farklı host'lar için saklanacak havuz sayısı
+MAX_HOST_POOLS = int(os.environ.get("OLLAMA_MAX_HOSTS", "4"))
+DEFAULT_TIMEOUT = int(os.environ.get("OLLAMA_TIMEOUT", "120"))
+
+
+class OllamaClient:
+    def __init__(self, max_connections: int = MAX_CONNECTIONS_PER_HOST, max_hosts: int = MAX_HOST_POOLS,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self._session = requests.Session()
+        # pool_block=True: sınır aşılırsa yeni soket açmak yerine havuzdan bağlantı beklenir
+        adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=max_connections, pool_block=True)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    # === SENKRON ===
+
+    def post(self, endpoint: str, payload: dict, timeout: float | None = None, **kwargs) -> requests.Response:
+        """Ham yanıtı döner; status kodu kontrolü (ör. model bulunamadı) çağırana aittir."""
+        return self._session.post(endpoint, json=payload, timeout=timeout or self.timeout, **kwargs)
+
+    def get(self, url: str, timeout: float | None = None, **kwargs) -> requests.Response:
+        return self._session.get(url, timeout=timeout or self.timeout, **kwargs)
+
+    def generate(self, endpoint: str, model: str, prompt: str, timeout: float | None = None, **fields) -> dict:
+        """Stream'siz /api/generate çağrısı; HTTP hatasında raise eder, JSON gövdeyi döner."""
+        payload = {"model": model, "prompt": prompt, "stream": False, **fields}
+        r = self.post(endpoint, payload, timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+
+    # === ASYNCIO ===
+
+    async def apost(self, endpoint: str, payload: dict, timeout: float | None = None, **kwargs) -> requests.Response:
+        # aynı havuzlu session bir worker thread üzerinde kullanılır; bağlantı sınırı ortak kalır
+        return await asyncio.to_thread(self.post, endpoint, payload, timeout, **kwargs)
+
+    async def agenerate(self, endpoint: str, model: str, prompt: str, timeout: float | None = None, **fields) -> dict:
+        return await asyncio.to_thread(self.generate, endpoint, model, prompt, timeout, **fields)
+
+    def close(self):
+        self._session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> OllamaClient:
+    """Süreç-genel paylaşılan istemci (ilk çağrıda oluşturulur)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OllamaClient()
+    return _client
+
+
+def iter_stream_chunks(response: requests.Response):
+    """stream=True ile yapılmış /api/generate yanıtının NDJSON satırlarından metin parçalarını üretir."""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            continue
+        data = json.loads(line)
+        if data.get("error"):
+            raise RuntimeError(f"Ollama akış hatası: {data['error']}")
+        piece = data.get("response", "")
+        if piece:
+            yield piece
+        if data.get("done"):
+            break
@@ -1,11 +1,18 @@
 #!/usr/bin/env python3
 """
 Task Queue Runner - FSM sistemini kuyruk ile çalıştırır
+Görev durumları ve FSM checkpoint'leri queue_store (SQLite) içinde tutulur;
+yarıda kesilen bir kuyruk tekrar çalıştırıldığında kaldığı yerden devam eder.
+--workers N ile kuyruk N sürece bölünür; her worker kendi çıktı alt dizinine yazar.
 """
 
 import os
 import sys
-from fsm_runner import fsm_run
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fsm_runner import fsm_run, EliteFSMRunner
+from queue_store import TaskQueueStore, QUEUE_DB
 
 def read_tasks(queue_file="task_queue.txt"):
     """Task queue dosyasından görevleri okur"""
@@ -17,31 +24,135 @@ def read_tasks(queue_file="task_queue.txt"):
         print(f"❌ Queue dosyası bulunamadı: {queue_file}")
         return []
 
-def process_queue():
-    """Tüm görevleri sırayla işler"""
-    tasks = read_tasks()
-    
+def run_task(store, runner, row, label):
+    """Tek görevi checkpoint'inden devam ettirerek çalıştırır; sonuç özetini döner"""
+    task = row["prompt"]
+    task_id = row["id"]
+    print(f"\n📋 GÖREV {label}")
+    print(f"🎯 {task}")
+    print("-" * 40)
+
+    started = time.monotonic()
+    store.mark_running(task_id)
+    error = None
+    try:
+        success = fsm_run(
+            task,
+            runner=runner,
+            resume=store.load_checkpoint(row),
+            on_checkpoint=lambda state, data: store.save_checkpoint(task_id, state, data),
+        )
+        if success:
+            store.mark_done(task_id)
+            print(f"✅ Görev {label} tamamlandı")
+        else:
+            store.mark_failed(task_id)
+            print(f"❌ Görev {label} başarısız")
+    except Exception as e:
+        success = False
+        error = str(e)
+        store.mark_failed(task_id, error)
+        print(f"❌ Görev {label} hatası: {e}")
+
+    print("=" * 60)
+    return {
+        "task": task,
+        "success": bool(success),
+        "error": error,
+        "seconds": time.monotonic() - started,
+    }
+
+def run_shard(task_ids, worker_index, db_path):
+    """Worker süreci: kendi DB bağlantısı, runner'ı ve çıktı alt dizini ile bir shard'ı işler"""
+    store = TaskQueueStore(db_path)
+    runner = EliteFSMRunner(output_subdir=f"worker_{worker_index}")
+    results = []
+    try:
+        for i, task_id in enumerate(task_ids, 1):
+            row = store.get_task(task_id)
+            if row is None:
+                continue
+            result = run_task(store, runner, row, f"w{worker_index} {i}/{len(task_ids)}")
+            result["worker"] = worker_index
+            results.append(result)
+    finally:
+        runner.close()
+        store.close()
+    return results
+
+def print_summary(results, elapsed, counts):
+    done = sum(1 for r in results if r["success"])
+    failed = len(results) - done
+    print(f"\n📊 Özet: {len(results)} görev, {done} başarılı, {failed} başarısız, {elapsed:.1f}s")
+    if results:
+        per_task = sorted(r["seconds"] for r in results)
+        print(f"⏱️ Görev süresi: ortalama {sum(per_task) / len(per_task):.1f}s, en uzun {per_task[-1]:.1f}s")
+    workers = sorted({r["worker"] for r in results if "worker" in r})
+    for w in workers:
+        mine = [r for r in results if r.get("worker") == w]
+        ok = sum(1 for r in mine if r["success"])
+        print(f"   worker_{w}: {len(mine)} görev, {ok} başarılı")
+    for r in results:
+        if not r["success"]:
+            print(f"   ❌ {r['task']}" + (f" ({r['error']})" if r["error"] else ""))
+    print(f"\n🎉 Kuyruk işlendi! (done={counts.get('done', 0)}, failed={counts.get('failed', 0)}, pending={counts.get('pending', 0)})")
+
+def process_queue(queue_file="task_queue.txt", db_path=QUEUE_DB, retry_failed=False, workers=1):
+    """Bekleyen görevleri işler (workers>1 ise süreç havuzunda); tamamlananlar atlanır"""
+    tasks = read_tasks(queue_file)
+
     if not tasks:
         print("📭 Queue boş!")
         return
-    
-    print(f"🚀 {len(tasks)} görev bulundu, işlem başlıyor...")
+
+    store = TaskQueueStore(db_path)
+    added = store.sync(tasks)
+    resumed = store.reset_interrupted()
+    if retry_failed:
+        store.requeue_failed()
+    pending = store.pending_tasks(tasks)
+
+    print(f"🚀 {len(tasks)} görev bulundu ({added} yeni, {resumed} yarıda kalmış), {len(pending)} görev işlenecek...")
     print("=" * 60)
-    
-    for i, task in enumerate(tasks, 1):
-        print(f"\n📋 GÖREV {i}/{len(tasks)}")
-        print(f"🎯 {task}")
-        print("-" * 40)
-        
+
+    if not pending:
+        print("✅ Bekleyen görev yok")
+        store.close()
+        return
+
+    started = time.monotonic()
+    results = []
+    workers = max(1, min(workers, len(pending)))
+    if workers == 1:
+        # Tek runner: analysis server tüm kuyruk boyunca açık kalır
+        runner = EliteFSMRunner()
         try:
-            fsm_run(task)
-            print(f"✅ Görev {i} tamamlandı")
-        except Exception as e:
-            print(f"❌ Görev {i} hatası: {e}")
-        
-        print("=" * 60)
-    
-    print(f"\n🎉 Tüm görevler tamamlandı! ({len(tasks)} görev)")
+            for i, row in enumerate(pending, 1):
+                results.append(run_task(store, runner, row, f"{i}/{len(pending)}"))
+        finally:
+            runner.close()
+    else:
+        # round-robin shard: her worker kendi sırasıyla işler
+        shards = [[row["id"] for row in pending[w::workers]] for w in range(workers)]
+        print(f"🧵 {workers} worker süreci başlatılıyor...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_shard, shard, w, db_path): w for w, shard in enumerate(shards)}
+            for future in as_completed(futures):
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    print(f"💥 worker_{futures[future]} çöktü: {e}")
+
+    counts = store.counts()
+    store.close()
+    print_summary(results, time.monotonic() - started, counts)
+    return results
 
 if __name__ == "__main__":
-    process_queue()
+    parser = argparse.ArgumentParser(description="FSM görev kuyruğunu çalıştırır")
+    parser.add_argument("--queue", default="task_queue.txt", help="Görev kuyruğu dosyası")
+    parser.add_argument("--db", default=QUEUE_DB, help="Kalıcı kuyruk veritabanı (SQLite)")
+    parser.add_argument("--retry-failed", action="store_true", help="Başarısız görevleri baştan tekrar çalıştır")
+    parser.add_argument("--workers", type=int, default=1, help="Paralel worker süreci sayısı")
+    args = parser.parse_args()
+    process_queue(args.queue, args.db, retry_failed=args.retry_failed, workers=args.workers)
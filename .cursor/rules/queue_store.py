@@ -0,0 +1,143 @@
+"""
+Kalıcı görev kuyruğu (SQLite) - queue_runner.py için.
+
+Her görev pending / running / done / failed durumlarından birindedir ve
+FSM her geçişte checkpoint yazar (sıradaki durum, plan, kod, son hata, retry sayısı).
+Yarıda kesilen bir çalıştırma yeniden başlatıldığında görevler son
+tamamlanan FSM durumundan devam eder; biten görevler tekrar çalıştırılmaz.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+QUEUE_DB = os.environ.get("FSM_QUEUE_DB", str(Path(__file__).resolve().parent / "logs" / "task_queue.db"))
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# checkpoint'te saklanan FSM değişkenleri
+CHECKPOINT_FIELDS = ("plan", "code", "filename", "filepath", "last_error", "retries")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prompt TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    fsm_state TEXT,
+    checkpoint TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class TaskQueueStore:
+    def __init__(self, db_path: str = QUEUE_DB):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        # check_same_thread=False: FSM aday thread'leri de checkpoint yazabilir (kilit ile)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            # WAL: birden fazla süreç aynı kuyruğu okuyup yazabilir
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(SCHEMA)
+
+    def _execute(self, sql: str, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def sync(self, prompts: list[str]) -> int:
+        """Kuyruk dosyasındaki yeni görevleri pending olarak ekler; eklenen sayısını döner."""
+        now = time.time()
+        added = 0
+        with self._lock, self._conn:
+            for prompt in prompts:
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO tasks (prompt, status, created_at, updated_at) VALUES (?, ?, ?, ?)",
+                    (prompt, STATUS_PENDING, now, now),
+                )
+                added += cur.rowcount
+        return added
+
+    def reset_interrupted(self) -> int:
+        """Önceki çalıştırmada running kalmış (yarıda kesilmiş) görevleri pending'e çeker."""
+        cur = self._execute(
+            "UPDATE tasks SET status = ?, updated_at = ? WHERE status = ?",
+            (STATUS_PENDING, time.time(), STATUS_RUNNING),
+        )
+        return cur.rowcount
+
+    def requeue_failed(self) -> int:
+        """Başarısız görevleri baştan (PLAN) çalıştırılmak üzere pending'e çeker."""
+        cur = self._execute(
+            "UPDATE tasks SET status = ?, fsm_state = NULL, checkpoint = NULL, updated_at = ? WHERE status = ?",
+            (STATUS_PENDING, time.time(), STATUS_FAILED),
+        )
+        return cur.rowcount
+
+    def pending_tasks(self, prompts: list[str]) -> list[sqlite3.Row]:
+        """Kuyruk dosyasındaki sıraya göre çalıştırılacak (pending) görevler."""
+        rows = self._execute("SELECT * FROM tasks WHERE status = ?", (STATUS_PENDING,)).fetchall()
+        by_prompt = {row["prompt"]: row for row in rows}
+        return [by_prompt[p] for p in dict.fromkeys(prompts) if p in by_prompt]
+
+    def get_task(self, task_id: int) -> sqlite3.Row | None:
+        return self._execute("SELECT * FROM tasks WHERE id = ?", (task_id,)).fetchone()
+
+    def mark_running(self, task_id: int):
+        self._execute(
+            "UPDATE tasks SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+            (STATUS_RUNNING, time.time(), task_id),
+        )
+
+    def save_checkpoint(self, task_id: int, state: str, data: dict):
+        checkpoint = {k: data.get(k) for k in CHECKPOINT_FIELDS}
+        self._execute(
+            "UPDATE tasks SET fsm_state = ?, checkpoint = ?, updated_at = ? WHERE id = ?",
+            (state, json.dumps(checkpoint, ensure_ascii=False), time.time(), task_id),
+        )
+
+    def load_checkpoint(self, row: sqlite3.Row) -> dict | None:
+        """FSM'in kaldığı yer: {"state": ..., plan, code, ...}; hiç checkpoint yoksa None."""
+        if not row["fsm_state"]:
+            return None
+        data = json.loads(row["checkpoint"] or "{}")
+        data["state"] = row["fsm_state"]
+        return data
+
+    def mark_done(self, task_id: int):
+        self._execute(
+            "UPDATE tasks SET status = ?, updated_at = ? WHERE id = ?",
+            (STATUS_DONE, time.time(), task_id),
+        )
+
+    def mark_failed(self, task_id: int, error: str | None = None):
+        with self._lock, self._conn:
+            if error is not None:
+                row = self._conn.execute("SELECT checkpoint FROM tasks WHERE id = ?", (task_id,)).fetchone()
+                checkpoint = json.loads(row["checkpoint"] or "{}") if row else {}
+                checkpoint["last_error"] = error
+                self._conn.execute(
+                    "UPDATE tasks SET checkpoint = ? WHERE id = ?",
+                    (json.dumps(checkpoint, ensure_ascii=False), task_id),
+                )
+            self._conn.execute(
+                "UPDATE tasks SET status = ?, updated_at = ? WHERE id = ?",
+                (STATUS_FAILED, time.time(), task_id),
+            )
+
+    def counts(self) -> dict:
+        rows = self._execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self):
+        self._conn.close()
@@ -1,10 +1,19 @@
 #!/usr/bin/env python3
+import os
 import re
+import sys
+import glob
 import json
+import time
 import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
-import sys
+
+# ortak bölüm ayrıştırıcısı .cursor/rules altında
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from section_parser import parse_sections
 
 def make_safe_base(s: str, max_len: int = 50) -> str:
     cleaned = re.sub(r"[^a-zA-Z0-9_\\-]", "_", s)
@@ -13,60 +22,137 @@ def make_safe_base(s: str, max_len: int = 50) -> str:
     short_hash = hashlib.sha1(s.encode("utf-8")).hexdigest()[:8]
     return f"{prefix}_{short_hash}".lower().rstrip("_")
 
-def main():
-    path = Path("last_sprint_output.txt")
-    if not path.exists():
-        print("last_sprint_output.txt yok.", file=sys.stderr)
-        sys.exit(1)
-    text = path.read_text(encoding="utf-8")
-
-    m = re.search(r'Sprint line: "(.*)"', text)
-    sprint_line = m.group(1) if m else "sprint"
-    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-    base = f"{make_safe_base(sprint_line)}_{timestamp}"
+def extract_artifacts(text: str, base: str) -> list[tuple[str, Path, str]]:
+    """Çıktıdaki bölümlerden (etiket, hedef yol, içerik) listesi üretir; diske yazmaz."""
+    # tek geçişte tüm bölümler; her türün ilk (şema için ilk geçerli) bölümü kullanılır
+    sections = {}
+    for section in parse_sections(text):
+        if section.kind == "schema" and section.schema_json() is None:
+            continue
+        sections.setdefault(section.kind, section)
 
+    artifacts = []
     # Flutter widget
-    flutter = re.search(r"### Flutter Widget ###\s*(.*?)\s*(?=###|$)", text, re.DOTALL)
+    flutter = sections.get("widget")
     if flutter:
-        code = flutter.group(1)
-        code = re.sub(r"^```(?:dart)?\n?", "", code)
-        code = re.sub(r"```$", "", code)
-        dst = Path("lib/components") / f"{base}.dart"
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        dst.write_text(code.strip() + "\n", encoding="utf-8")
-        print(f"✅ Flutter widget yazıldı: {dst}")
+        artifacts.append(("Flutter widget", Path("lib/components") / f"{base}.dart", flutter.code().strip() + "\n"))
 
     # Firestore schema
-    schema = re.search(r"### Firestore Schema ###\s*(\{.*?\})\s*(?=###|$)", text, re.DOTALL)
+    schema = sections.get("schema")
     if schema:
-        schema_json = schema.group(1)
+        schema_json = schema.schema_json()
         try:
             parsed = json.loads(schema_json)
             pretty = json.dumps(parsed, indent=2, ensure_ascii=False)
         except Exception:
             pretty = schema_json
-        dst = Path("schemas") / f"{base}.json"
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        dst.write_text(pretty + "\n", encoding="utf-8")
-        print(f"✅ Schema yazıldı: {dst}")
+        artifacts.append(("Schema", Path("schemas") / f"{base}.json", pretty + "\n"))
 
     # AI Summary Prompt
-    ai_prompt = re.search(r"### AI Summary Prompt ###\s*(.*?)\s*(?=###|$)", text, re.DOTALL)
+    ai_prompt = sections.get("ai_summary")
     if ai_prompt:
-        prompt_text = ai_prompt.group(1).strip()
-        dst = Path("prompts") / f"{base}_ai_summary.txt"
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        dst.write_text(prompt_text + "\n", encoding="utf-8")
-        print(f"✅ AI Summary Prompt yazıldı: {dst}")
+        artifacts.append(("AI Summary Prompt", Path("prompts") / f"{base}_ai_summary.txt", ai_prompt.body + "\n"))
 
     # PDF Export Instructions
-    pdf_instructions = re.search(r"### PDF Export Instructions ###\s*(.*?)\s*(?=###|$)", text, re.DOTALL)
+    pdf_instructions = sections.get("pdf_export")
     if pdf_instructions:
-        instructions_text = pdf_instructions.group(1).strip()
-        dst = Path("prompts") / f"{base}_pdf_export.txt"
-        dst.parent.mkdir(parents=True, exist_ok=True)
-        dst.write_text(instructions_text + "\n", encoding="utf-8")
-        print(f"✅ PDF Export Instructions yazıldı: {dst}")
+        artifacts.append(("PDF Export Instructions", Path("prompts") / f"{base}_pdf_export.txt", pdf_instructions.body + "\n"))
+    return artifacts
+
+def write_if_changed(dst: Path, content: str) -> bool:
+    """İçerik hash'i aynıysa dosyaya dokunmaz; yazıldıysa True."""
+    data = content.encode("utf-8")
+    try:
+        if hashlib.sha256(dst.read_bytes()).digest() == hashlib.sha256(data).digest():
+            return False
+    except FileNotFoundError:
+        pass
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    # yarım yazılmış artifact kalmasın: geçici dosya + rename
+    tmp = dst.with_name(f".{dst.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, dst)
+    return True
+
+# === BULK ===
+
+def raw_base(path: Path) -> str:
+    """outputs/<safe>_<zaman>_raw.txt → <safe>_<zaman> (her çalıştırmada aynı artifact adları)."""
+    stem = path.stem
+    return stem[:-len("_raw")] if stem.endswith("_raw") else stem
+
+def materialize(path: str, out_root: str) -> dict:
+    """Worker: tek ham çıktıdaki bölümleri out_root altına idempotent yazar."""
+    result = {"path": path, "sections": 0, "written": 0, "unchanged": 0, "error": None}
+    try:
+        src = Path(path)
+        text = src.read_text(encoding="utf-8")
+        for _, rel, content in extract_artifacts(text, raw_base(src)):
+            result["sections"] += 1
+            if write_if_changed(Path(out_root) / rel, content):
+                result["written"] += 1
+            else:
+                result["unchanged"] += 1
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def collect_sources(patterns) -> list[str]:
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.update(glob.glob(os.path.join(pattern, "**", "*_raw.txt"), recursive=True))
+        else:
+            paths.update(glob.glob(pattern, recursive=True))
+    return sorted(p for p in paths if os.path.isfile(p))
+
+def bulk(patterns, out_root: str = ".", workers: int | None = None) -> int:
+    started = time.monotonic()
+    sources = collect_sources(patterns)
+    if not sources:
+        print("Eşleşen çıktı dosyası yok.", file=sys.stderr)
+        return 1
+    if workers == 1 or len(sources) == 1:
+        results = [materialize(p, out_root) for p in sources]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(sources) // ((workers or os.cpu_count() or 1) * 4))
+            results = list(pool.map(materialize, sources, [out_root] * len(sources), chunksize=chunksize))
+    errors = [r for r in results if r["error"]]
+    empty = [r for r in results if not r["error"] and not r["sections"]]
+    print(
+        f"📊 {len(results)} dosya, {sum(r['sections'] for r in results)} bölüm: "
+        f"{sum(r['written'] for r in results)} yazıldı, {sum(r['unchanged'] for r in results)} değişmemiş, "
+        f"{len(empty)} bölümsüz, {len(errors)} hata ({time.monotonic() - started:.2f}s)"
+    )
+    for r in errors:
+        print(f"   ❌ {r['path']}: {r['error']}")
+    return 1 if errors else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sprint çıktısındaki bölümleri artifact dosyalarına yazar")
+    parser.add_argument("--bulk", nargs="+", metavar="DIR|GLOB",
+                        help="dizindeki tüm *_raw.txt dosyalarını veya glob eşleşmelerini toplu işle")
+    parser.add_argument("--out-root", default=".", help="lib/components, schemas, prompts'un oluşturulacağı kök")
+    parser.add_argument("--workers", type=int, default=None, help="worker süreci sayısı (varsayılan: CPU sayısı)")
+    args = parser.parse_args(argv)
+    if args.bulk:
+        sys.exit(bulk(args.bulk, args.out_root, args.workers))
+
+    path = Path("last_sprint_output.txt")
+    if not path.exists():
+        print("last_sprint_output.txt yok.", file=sys.stderr)
+        sys.exit(1)
+    text = path.read_text(encoding="utf-8")
+
+    m = re.search(r'Sprint line: "(.*)"', text)
+    sprint_line = m.group(1) if m else "sprint"
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    base = f"{make_safe_base(sprint_line)}_{timestamp}"
+
+    for label, dst, content in extract_artifacts(text, base):
+        write_if_changed(dst, content)
+        print(f"✅ {label} yazıldı: {dst}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
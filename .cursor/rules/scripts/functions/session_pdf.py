@@ -0,0 +1,247 @@
+"""
+Seans özeti PDF'leri (session_summary.py).
+
+- Özet metni sayfa genişliğine göre sarılır, sayfa dolunca yeni sayfaya geçilir
+  (devam sayfalarında kısa başlık ve sayfa numarası)
+- Font kaydı ve sayfa şablonu (kelime genişlikleri dahil) süreç başına bir kez hazırlanır
+- Belge doğrudan hedefe yazılır: diskte geçici dosya + rename, istemciye giden
+  yanıtta tek bir bellek tamponu (ara kopya yok)
+- Toplu çıktılar render_in_pool() ile ayrı süreçlerde üretilir; istek thread'leri
+  PDF çizimi için GIL'i paylaşmaz
+- Bir worker ölürse (OOM, reportlab çökmesi) bozulan havuz atılıp yeniden kurulur;
+  ikinci deneme de başarısızsa PDF'ler bu süreçte çizilir
+"""
+
+import os
+import io
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import lru_cache
+
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+logger = logging.getLogger("session_pdf")
+
+# Türkçe karakterler (ş, ğ, ı) için TTF; bulunamazsa yerleşik Helvetica
+FONT_PATH = os.environ.get("SESSION_PDF_FONT", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf")
+FONT_BOLD_PATH = os.environ.get("SESSION_PDF_FONT_BOLD", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf")
+RENDER_WORKERS = int(os.environ.get("SESSION_PDF_WORKERS", "2"))
+
+MARGIN = 72
+BODY_SIZE = 12
+LEADING = 15
+TITLE = "PsyClinic AI - Seans Özeti"
+
+
+@lru_cache(maxsize=None)
+def get_fonts() -> tuple[str, str]:
+    """(normal, kalın) font adları; TTF'ler süreçte yalnızca ilk çağrıda kaydedilir."""
+    try:
+        pdfmetrics.registerFont(TTFont("SessionSans", FONT_PATH))
+        pdfmetrics.registerFont(TTFont("SessionSans-Bold", FONT_BOLD_PATH))
+        return "SessionSans", "SessionSans-Bold"
+    except Exception:
+        return "Helvetica", "Helvetica-Bold"
+
+
+class PageTemplate:
+    """Sayfa ölçüleri ve metin sarma; kelime genişlikleri belgeler arasında paylaşılır."""
+
+    def __init__(self, font: str, bold: str, pagesize=letter, size: int = BODY_SIZE, leading: int = LEADING):
+        self.font = font
+        self.bold = bold
+        self.width, self.height = pagesize
+        self.pagesize = pagesize
+        self.size = size
+        self.leading = leading
+        self.text_width = self.width - 2 * MARGIN
+        self._widths = {}
+        self._lock = threading.Lock()
+
+    def _width(self, word: str) -> float:
+        w = self._widths.get(word)
+        if w is None:
+            w = pdfmetrics.stringWidth(word, self.font, self.size)
+            with self._lock:
+                if len(self._widths) > 50_000:
+                    self._widths.clear()
+                self._widths[word] = w
+        return w
+
+    def _split_long(self, word: str) -> list[str]:
+        # sığmayan tek kelime (URL, kod) karakter bazında bölünür
+        parts, current = [], ""
+        for ch in word:
+            if current and self._width(current + ch) > self.text_width:
+                parts.append(current)
+                current = ch
+            else:
+                current += ch
+        return parts + [current]
+
+    def wrap(self, text: str) -> list[str]:
+        space = self._width(" ")
+        lines = []
+        for paragraph in text.splitlines():
+            # baştaki girinti (madde işaretleri) korunur
+            indent = paragraph[:len(paragraph) - len(paragraph.lstrip())]
+            words = paragraph.split()
+            if not words:
+                lines.append("")
+                continue
+            current, current_w = indent, self._width(indent) if indent else 0.0
+            for word in words:
+                w = self._width(word)
+                if w > self.text_width:
+                    *full, word = self._split_long(word)
+                    for part in full:
+                        if current.strip():
+                            lines.append(current)
+                        lines.append(part)
+                        current, current_w = "", 0.0
+                    w = self._width(word)
+                gap = space if current.strip() else 0.0
+                if current.strip() and current_w + gap + w > self.text_width:
+                    lines.append(current)
+                    current, current_w, gap = "", 0.0, 0.0
+                current = current + (" " if gap else "") + word
+                current_w += gap + w
+            lines.append(current)
+        return lines
+
+
+@lru_cache(maxsize=None)
+def get_template() -> PageTemplate:
+    return PageTemplate(*get_fonts())
+
+
+def _draw_header(c, tpl: PageTemplate, patient: str, therapist: str, page: int) -> float:
+    """Sayfa başlığı; gövdenin başlayacağı y koordinatını döner."""
+    top = tpl.height - MARGIN + 30
+    if page == 1:
+        c.setFont(tpl.bold, 16)
+        c.drawString(MARGIN, top, TITLE)
+        c.setFont(tpl.font, 12)
+        c.drawString(MARGIN, top - 20, f"Danışan: {patient}")
+        c.drawString(MARGIN, top - 35, f"Terapist: {therapist}")
+        c.drawString(MARGIN, top - 50, f"Tarih: {datetime.utcnow().strftime('%Y-%m-%d')}")
+        c.drawString(MARGIN, top - 70, "AI Özet:")
+        return top - 90
+    c.setFont(tpl.font, 9)
+    c.drawString(MARGIN, top, f"{TITLE} - {patient} (devam)")
+    return top - 25
+
+
+def draw_summary(c, summary: str, patient: str, therapist: str, tpl: PageTemplate | None = None) -> int:
+    """Bir seansı gerektiği kadar sayfaya çizer; kullanılan sayfa sayısını döner."""
+    tpl = tpl or get_template()
+    lines = tpl.wrap(summary)
+    page, start = 1, 0
+    while True:
+        y = _draw_header(c, tpl, patient, therapist, page)
+        per_page = max(1, int((y - MARGIN) // tpl.leading) + 1)
+        chunk = lines[start:start + per_page]
+        text = c.beginText(MARGIN, y)
+        text.setFont(tpl.font, tpl.size)
+        text.setLeading(tpl.leading)
+        for line in chunk:
+            text.textLine(line)
+        c.drawText(text)
+        start += len(chunk)
+        more = start < len(lines)
+        if page > 1 or more:
+            c.setFont(tpl.font, 9)
+            c.drawRightString(tpl.width - MARGIN, MARGIN / 2, f"Sayfa {page}")
+        c.showPage()
+        if not more:
+            return page
+        page += 1
+
+
+def render_sessions(sessions, target):
+    """sessions: [(özet, danışan, terapist)]; target bir yol veya yazılabilir dosya nesnesi."""
+    tpl = get_template()
+    c = canvas.Canvas(target, pagesize=tpl.pagesize)
+    for summary, patient, therapist in sessions:
+        draw_summary(c, summary, patient, therapist, tpl)
+    c.save()
+
+
+def render_to_file(sessions, path: str) -> str:
+    """Hedefe geçici dosya + rename ile yazar; yarım PDF okunmaz."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        render_sessions(sessions, tmp)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return path
+
+
+def render_to_buffer(sessions) -> io.BytesIO:
+    """İstemciye doğrudan gönderilecek PDF; okumaya hazır (başa sarılmış) tampon."""
+    buffer = io.BytesIO()
+    render_sessions(sessions, buffer)
+    buffer.seek(0)
+    return buffer
+
+
+# === SÜREÇ HAVUZU ===
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Toplu PDF'ler için süreç-genel havuz (ilk çağrıda oluşturulur)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # çok thread'li sunucudan fork güvenli değil; forkserver/spawn kullanılır
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                _pool = ProcessPoolExecutor(max_workers=RENDER_WORKERS,
+                                            mp_context=multiprocessing.get_context(method))
+    return _pool
+
+
+def _discard_pool(broken: ProcessPoolExecutor):
+    """Bozulan havuzu bırakır; sonraki get_render_pool() yenisini kurar."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def render_in_pool(jobs) -> list[str]:
+    """jobs: [(sessions, path)]; hepsini havuzda render edip yolları (sırayla) döner."""
+    jobs = [(list(sessions), path) for sessions, path in jobs]
+    for attempt in range(2):
+        pool = get_render_pool()
+        try:
+            futures = [pool.submit(render_to_file, sessions, path) for sessions, path in jobs]
+            return [f.result() for f in futures]
+        except BrokenProcessPool as e:
+            logger.warning(f"⚠️ PDF süreç havuzu bozuldu ({attempt + 1}. deneme): {e}")
+            _discard_pool(pool)
+    # havuz yine çöktü: istek düşmesin, bu süreçte çizilir
+    return [render_to_file(sessions, path) for sessions, path in jobs]
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
@@ -1,37 +1,74 @@
 import os
-import io
-from flask import Flask, request, jsonify
-import requests
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+import sys
+import hashlib
+import signal
+import logging
+import zipfile
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from flask import Flask, request, jsonify, send_file, url_for
+from werkzeug.serving import make_server, WSGIRequestHandler
+from werkzeug.wsgi import ClosingIterator
 from datetime import datetime
 
+# ortak Ollama istemcisi .cursor/rules altında
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from ollama_client import get_client
+from summary_cache import get_summary_cache
+from summary_jobs import JobStore, JobRunner, STATUS_DONE, STATUS_QUEUED
+from session_pdf import get_template, render_to_file, render_to_buffer, render_in_pool, shutdown_pool as shutdown_render_pool
+
 app = Flask(__name__)
+logger = logging.getLogger("session_summary")
 
 OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://localhost:11434/api/generate")
 DEFAULT_MODEL = "mistral:latest"
 
-def call_ollama(prompt: str, model: str = DEFAULT_MODEL, retries: int = 3) -> str:
+# sunucu ayarları (--debug dışındaki çok thread'li mod)
+SERVE_HOST = os.environ.get("SESSION_SUMMARY_HOST", "127.0.0.1")
+SERVE_PORT = int(os.environ.get("SESSION_SUMMARY_PORT", "5002"))
+# modele aynı anda gidebilecek en fazla istek (paylaşılan istemci havuzunu aşmamalı)
+MODEL_CONCURRENCY = int(os.environ.get("SESSION_MODEL_CONCURRENCY", "4"))
+MODEL_TIMEOUT = float(os.environ.get("SESSION_MODEL_TIMEOUT", "120"))
+# /summarize_batch: istek başına eşzamanlı özet ve öğe sınırı
+BATCH_CONCURRENCY = int(os.environ.get("SESSION_BATCH_CONCURRENCY", str(MODEL_CONCURRENCY)))
+BATCH_MAX_ITEMS = int(os.environ.get("SESSION_BATCH_MAX_ITEMS", "200"))
+# boş model slotu için en fazla bekleme; aşılırsa 503
+SLOT_TIMEOUT = float(os.environ.get("SESSION_SLOT_TIMEOUT", "30"))
+# yavaş/asılı istemci soketleri için okuma-yazma zaman aşımı
+SOCKET_TIMEOUT = float(os.environ.get("SESSION_SOCKET_TIMEOUT", "30"))
+# kapanışta uçuştaki isteklerin bitmesi için beklenecek süre
+SHUTDOWN_GRACE = float(os.environ.get("SESSION_SHUTDOWN_GRACE", "30"))
+
+_model_slots = threading.BoundedSemaphore(MODEL_CONCURRENCY)
+
+class ModelBusyError(Exception):
+    """SLOT_TIMEOUT içinde boş model slotu bulunamadı."""
+
+def call_ollama(prompt: str, model: str = DEFAULT_MODEL, retries: int = 3, wait: bool = False) -> str:
+    """wait=False: senkron HTTP istekleri (slot yoksa 503); wait=True: iş/parti öğeleri sırasını bekler."""
     payload = {"model": model, "prompt": prompt, "stream": False}
     for attempt in range(retries):
+        if not _model_slots.acquire(timeout=None if wait else SLOT_TIMEOUT):
+            raise ModelBusyError(f"{SLOT_TIMEOUT:.0f}s içinde boş model slotu yok")
         try:
-            r = requests.post(OLLAMA_URL, json=payload, timeout=120)
+            r = get_client().post(OLLAMA_URL, payload, timeout=MODEL_TIMEOUT)
             r.raise_for_status()
             return r.json().get("response", "").strip()
         except Exception as e:
             if attempt == retries - 1:
                 raise
+        finally:
+            _model_slots.release()
     return ""
 
-@app.route("/summarize_and_export", methods=["POST"])
-def summarize_and_export():
-    data = request.get_json(force=True)
-    notes = data.get("notes", "")
-    patient = data.get("patient", "Unknown")
-    therapist = data.get("therapist", "Unknown")
+@app.errorhandler(ModelBusyError)
+def _model_busy(e):
+    return jsonify({"error": str(e)}), 503, {"Retry-After": str(max(1, int(SLOT_TIMEOUT)))}
 
-    # LLM prompt (PRD'ye uygun)
-    prompt = f"""You are a clinical AI assistant analyzing therapy session notes. Please provide a structured summary with the following fields:
+PROMPT_TEMPLATE = """You are a clinical AI assistant analyzing therapy session notes. Please provide a structured summary with the following fields:
 
 1. **Affect**: Describe the patient's emotional state and mood during the session
 2. **Theme**: Identify the main themes, topics, or issues discussed
@@ -45,36 +82,300 @@ Format your response as:
 Session notes:
 \"\"\"{notes}\"\"\""""
 
-    summary = call_ollama(prompt)
-
-    # PDF oluştur
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(72, 750, "PsyClinic AI - Seans Özeti")
-    c.setFont("Helvetica", 12)
-    c.drawString(72, 730, f"Danışan: {patient}")
-    c.drawString(72, 715, f"Terapist: {therapist}")
-    c.drawString(72, 700, f"Tarih: {datetime.utcnow().strftime('%Y-%m-%d')}")
-    c.drawString(72, 680, "AI Özet:")
-    text = c.beginText(72, 660)
-    for line in summary.splitlines():
-        text.textLine(line)
-    c.drawText(text)
-    c.showPage()
-    c.save()
-    buffer.seek(0)
+# cache anahtarının parçası: şablon değişince eski özetler kendiliğinden geçersiz olur
+PROMPT_VERSION = hashlib.sha256(PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+def build_prompt(notes: str) -> str:
+    # LLM prompt (PRD'ye uygun)
+    return PROMPT_TEMPLATE.format(notes=notes)
+
+def summarize_notes(notes: str, wait: bool = False) -> str:
+    """Aynı notlar + model + prompt sürümü için şifreli cache'teki özet; yoksa modele gidilir."""
+    return get_summary_cache().get_or_call(
+        DEFAULT_MODEL, notes, lambda: call_ollama(build_prompt(notes), wait=wait),
+        options={"prompt_version": PROMPT_VERSION},
+    )
 
+def output_path(prefix: str, ext: str) -> str:
     os.makedirs("outputs", exist_ok=True)
-    pdf_name = f"session_summary_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.pdf"
-    pdf_path = os.path.join("outputs", pdf_name)
-    with open(pdf_path, "wb") as f:
-        f.write(buffer.read())
+    return os.path.join("outputs", f"{prefix}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')}.{ext}")
+
+def render_pdf(summary: str, patient: str, therapist: str) -> str:
+    # PDF doğrudan outputs/ altına yazılır (sarılmış, gerekirse çok sayfalı)
+    return render_to_file([(summary, patient, therapist)], output_path("session_summary", "pdf"))
+
+def summarize_session(data: dict, wait: bool = False) -> tuple[str, str]:
+    """Özet + PDF; hem senkron endpoint hem arka plan işleri (wait=True) kullanır."""
+    summary = summarize_notes(data.get("notes", ""), wait=wait)
+    pdf_path = render_pdf(summary, data.get("patient", "Unknown"), data.get("therapist", "Unknown"))
+    return summary, pdf_path
+
+def wants_pdf() -> bool:
+    """?format=pdf veya yalnızca PDF kabul eden istemci: dosya yerine PDF gövdesi döner."""
+    if request.args.get("format") == "pdf":
+        return True
+    return request.accept_mimetypes.best_match(["application/json", "application/pdf"]) == "application/pdf"
 
+@app.route("/summarize_and_export", methods=["POST"])
+def summarize_and_export():
+    data = request.get_json(force=True)
+    if wants_pdf():
+        # diske yazmadan doğrudan istemciye
+        summary = summarize_notes(data.get("notes", ""))
+        buffer = render_to_buffer([(summary, data.get("patient", "Unknown"), data.get("therapist", "Unknown"))])
+        return send_file(buffer, mimetype="application/pdf", download_name="session_summary.pdf")
+    summary, pdf_path = summarize_session(data)
     return jsonify({
         "summary": summary,
         "pdf_path": pdf_path
     })
 
+# === TOPLU ÖZET ===
+
+def _batch_item(index: int, item) -> dict:
+    """Tek bir öğe; hata tüm partiyi durdurmaz, sonuçta "error" olarak döner."""
+    result = {"index": index, "status": "error", "summary": None, "error": None}
+    if not isinstance(item, dict):
+        result["error"] = "öğe bir JSON nesnesi olmalı"
+        return result
+    result["patient"] = item.get("patient", "Unknown")
+    result["therapist"] = item.get("therapist", "Unknown")
+    try:
+        # parti öğeleri 503 ile düşmez; model slotu için sıralarını bekler
+        result["summary"] = summarize_notes(item.get("notes", ""), wait=True)
+        result["status"] = "ok"
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def _session(r: dict) -> tuple[str, str, str]:
+    return r["summary"], r["patient"], r["therapist"]
+
+def write_combined_pdf(results: list[dict]) -> str:
+    """Başarılı her seansı (gerekirse çok sayfalı) içeren tek PDF; süreç havuzunda çizilir."""
+    return render_in_pool([([_session(r) for r in results], output_path("session_batch", "pdf"))])[0]
+
+def write_combined_zip(results: list[dict]) -> str:
+    # seans PDF'leri süreç havuzunda paralel çizilir
+    paths = render_in_pool([([_session(r)], output_path(f"session_summary_{r['index']:03d}", "pdf")) for r in results])
+    zip_path = output_path("session_batch", "zip")
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for r, path in zip(results, paths):
+            r["pdf_path"] = path
+            zf.write(path, os.path.basename(path))
+    return zip_path
+
+@app.route("/summarize_batch", methods=["POST"])
+def summarize_batch():
+    data = request.get_json(force=True)
+    items = data.get("items") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items listesi gerekli"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"en fazla {BATCH_MAX_ITEMS} öğe gönderilebilir"}), 413
+    fmt = data.get("format", "pdf")
+    if fmt not in ("pdf", "zip"):
+        return jsonify({"error": "format pdf veya zip olmalı"}), 400
+    try:
+        requested = int(data.get("concurrency") or BATCH_CONCURRENCY)
+    except (TypeError, ValueError):
+        return jsonify({"error": "concurrency bir tam sayı olmalı"}), 400
+    # istemci yalnızca sunucu sınırının altına inebilir
+    concurrency = max(1, min(requested, BATCH_CONCURRENCY, len(items)))
+
+    # model tarafındaki toplam yük yine _model_slots ile sınırlı; bu havuz partinin payını belirler
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="summary_batch") as pool:
+        results = list(pool.map(_batch_item, range(len(items)), items))
+
+    succeeded = [r for r in results if r["status"] == "ok"]
+    combined, combine_error = None, None
+    if succeeded:
+        try:
+            combined = write_combined_zip(succeeded) if fmt == "zip" else write_combined_pdf(succeeded)
+        except Exception as e:
+            # birleştirme hatası hesaplanmış özetleri düşürmez; sonuçlar yine döner
+            logger.error(f"❌ Toplu {fmt} çıktısı üretilemedi: {e}")
+            combine_error = str(e) or type(e).__name__
+    body = {
+        "total": len(results),
+        "succeeded": len(succeeded),
+        "failed": len(results) - len(succeeded),
+        "format": fmt,
+        "combined_path": combined,
+        "combine_error": combine_error,
+        "results": results,
+    }
+    # hiçbir öğe özetlenemediyse model tarafı sorunludur
+    return jsonify(body), 200 if succeeded else 502
+
+# === ASENKRON İŞLER ===
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+def get_job_runner() -> JobRunner:
+    """İlk çağrıda iş havuzunu kurar ve önceki çalıştırmadan kalan işleri devam ettirir."""
+    global _job_runner
+    if _job_runner is None:
+        with _job_runner_lock:
+            if _job_runner is None:
+                # arka plan işleri model slotunu bekler; ModelBusyError ile kalıcı olarak düşmez
+                runner = JobRunner(JobStore(), lambda req: summarize_session(req, wait=True))
+                runner.resume()
+                _job_runner = runner
+    return _job_runner
+
+@app.before_request
+def _start_job_runner():
+    # debug reloader'ın izleyici süreci istek almaz; işler yalnızca sunan süreçte çalışır
+    get_job_runner()
+
+def _job_json(row) -> dict:
+    return {
+        "job_id": row["id"],
+        "status": row["status"],
+        "error": row["error"],
+        "summary_url": url_for("job_summary", job_id=row["id"]) if row["status"] == STATUS_DONE else None,
+        "pdf_url": url_for("job_pdf", job_id=row["id"]) if row["status"] == STATUS_DONE else None,
+    }
+
+def _finished_job(job_id: str):
+    """(satır, None) veya (None, hata yanıtı)."""
+    row = get_job_runner().store.get(job_id)
+    if row is None:
+        return None, (jsonify({"error": "iş bulunamadı"}), 404)
+    if row["status"] != STATUS_DONE:
+        return None, (jsonify(_job_json(row)), 409)
+    return row, None
+
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    data = request.get_json(force=True)
+    fields = {k: data.get(k, default) for k, default in (("notes", ""), ("patient", "Unknown"), ("therapist", "Unknown"))}
+    job_id = get_job_runner().submit(fields)
+    return jsonify({"job_id": job_id, "status": STATUS_QUEUED,
+                    "status_url": url_for("job_status", job_id=job_id)}), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    row = get_job_runner().store.get(job_id)
+    if row is None:
+        return jsonify({"error": "iş bulunamadı"}), 404
+    return jsonify(_job_json(row))
+
+@app.route("/jobs/<job_id>/summary", methods=["GET"])
+def job_summary(job_id):
+    row, error = _finished_job(job_id)
+    if error:
+        return error
+    try:
+        summary = get_job_runner().store.summary(row)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 410
+    return jsonify({"job_id": job_id, "summary": summary})
+
+@app.route("/jobs/<job_id>/pdf", methods=["GET"])
+def job_pdf(job_id):
+    row, error = _finished_job(job_id)
+    if error:
+        return error
+    pdf_path = os.path.abspath(row["pdf_path"])
+    if not os.path.exists(pdf_path):
+        return jsonify({"error": "PDF dosyası bulunamadı"}), 410
+    return send_file(pdf_path, mimetype="application/pdf", download_name=os.path.basename(pdf_path))
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    cache = get_summary_cache()
+    return jsonify({
+        "summary_cache": {**cache.stats(), "disabled": cache.disabled},
+        "jobs": get_job_runner().store.counts(),
+    })
+
+# === SUNUCU ===
+
+class _RequestHandler(WSGIRequestHandler):
+    # socketserver bu değeri her bağlantının soket zaman aşımı olarak uygular
+    timeout = SOCKET_TIMEOUT
+
+class _InFlight:
+    """WSGI sarmalayıcı: kapanışta beklenecek uçuştaki istekleri sayar."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def __call__(self, environ, start_response):
+        with self._cond:
+            self.active += 1
+        try:
+            body = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self._done()
+            raise
+        # yanıt gövdesi gönderilip kapatılana kadar istek uçuşta sayılır
+        return ClosingIterator(body, self._done)
+
+    def _done(self):
+        with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def wait_idle(self, timeout: float) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self.active == 0, timeout)
+
+def create_server(host: str = SERVE_HOST, port: int = SERVE_PORT):
+    """Her isteği ayrı thread'de işleyen WSGI sunucusu; port=0 boş port seçer."""
+    # font/şablon ilk isteğin gecikmesine eklenmesin
+    get_template()
+    tracker = _InFlight(app.wsgi_app)
+    server = make_server(host, port, tracker, threaded=True, request_handler=_RequestHandler)
+    server.in_flight = tracker
+    return server
+
+def shutdown_server(server, grace: float = SHUTDOWN_GRACE):
+    """Yeni bağlantı kabulünü durdurur, uçuştaki istekleri ve özet işlerini bekler."""
+    server.shutdown()
+    if not server.in_flight.wait_idle(grace):
+        logger.warning(f"⚠️ {server.in_flight.active} istek {grace:.0f}s içinde bitmedi, kapatılıyor")
+    server.server_close()
+    if _job_runner is not None:
+        # çalışan işler biter; kuyruktakiler kalıcı, bir sonraki başlangıçta devam eder
+        _job_runner.shutdown(wait=True)
+    shutdown_render_pool()
+    get_client().close()
+
+def serve(host: str = SERVE_HOST, port: int = SERVE_PORT):
+    server = create_server(host, port)
+    stop = threading.Event()
+
+    def _handler(signum, frame):
+        logger.info(f"Signal {signum} received, shutting down...")
+        stop.set()
+    signal.signal(signal.SIGINT, _handler)
+    signal.signal(signal.SIGTERM, _handler)
+
+    # önceki çalıştırmadan kalan işler ilk isteği beklemeden devam etsin
+    get_job_runner()
+    thread = threading.Thread(target=server.serve_forever, name="session_summary_server", daemon=True)
+    thread.start()
+    logger.info(f"🚀 session_summary http://{host}:{server.server_port} (model eşzamanlılığı {MODEL_CONCURRENCY})")
+    stop.wait()
+    logger.info("🛑 Durduruluyor...")
+    shutdown_server(server)
+    thread.join()
+    logger.info("✅ Sunucu kapatıldı.")
+
 if __name__ == "__main__":
-    app.run(port=5002, debug=True) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Seans özeti + PDF servisi")
+    parser.add_argument("--host", default=SERVE_HOST)
+    parser.add_argument("--port", type=int, default=SERVE_PORT)
+    parser.add_argument("--debug", action="store_true", help="Flask geliştirme sunucusu (reloader + debugger)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.debug:
+        app.run(host=args.host, port=args.port, debug=True)
+    else:
+        serve(args.host, args.port)
@@ -1,13 +1,19 @@
 import os
 import re
+import sys
 import json
-import time
 import argparse
 import logging
 import hashlib
 from datetime import datetime
 from pathlib import Path
-import requests
+
+# ortak Ollama istemcisi .cursor/rules altında
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from ollama_client import get_client
+from llm_cache import get_cache
+from section_parser import parse_sections
+from circuit_breaker import call_with_fallbacks, ModelNotFoundError, ModelsUnavailableError
 
 # === CONFIG ===
 # This script assumes a single Ollama HTTP endpoint that multiplexes multiple models by passing the desired model name
@@ -75,61 +81,70 @@ Output sections clearly delimited:
 ...short example snippet or explanation for creating the PDF from the summary..."""
 
 
-def call_ollama(model: str, prompt: str) -> dict:
+def call_ollama(model: str, prompt: str, bypass_cache: bool = False) -> dict:
+    """Tek çağrı; yeniden deneme ve model sağlığı try_with_fallbacks()'teki devre kesiciye aittir."""
+    cache = get_cache()
+    cached = cache.get(model, prompt, bypass=bypass_cache)
+    if cached is not None:
+        logger.info(f"💾 Cache'ten yanıt: model={model}")
+        return cached
     payload = {"model": model, "prompt": prompt, "stream": False}
-    last_err = None
-    session = requests.Session()
-    for attempt in range(1, RETRY_ATTEMPTS + 1):
+    logger.info(f"Ollama çağrısı: model={model}")
+    r = get_client().post(OLLAMA_URL, payload, timeout=TIMEOUT)
+    # handle explicit model-not-found error in body
+    if r.status_code in (400, 404):
         try:
-            logger.info(f"Ollama çağrısı: model={model} deneme={attempt}")
-            r = session.post(OLLAMA_URL, json=payload, timeout=TIMEOUT)
-            # handle explicit model-not-found error in body
-            if r.status_code == 400:
-                try:
-                    j = r.json()
-                    err = str(j.get("error", "")).lower()
-                    if "model" in err and "not found" in err:
-                        raise RuntimeError(f"Model not found: {err}")
-                except ValueError:
-                    pass
-            r.raise_for_status()
-            data = r.json()
-            return data
-        except Exception as e:
-            last_err = e
-            wait = 2 ** (attempt - 1)
-            logger.warning(f"⚠️ Ollama çağrısı hatası ({attempt}/{RETRY_ATTEMPTS}): {e}; {wait}s sonra yeniden denenecek.")
-            time.sleep(wait)
-    raise RuntimeError(f"Tüm Ollama denemeleri başarısız oldu: {last_err}")
-
-
-def try_with_fallbacks(primary: str, prompt: str) -> dict:
-    order = [primary] + FALLBACK_CHAINS.get(primary, [])
-    last_exc = None
-    for model in order:
+            err = str(r.json().get("error", "")).lower()
+        except ValueError:
+            err = ""
+        if "model" in err and "not found" in err:
+            raise ModelNotFoundError(f"Model not found: {err}")
+    r.raise_for_status()
+    data = r.json()
+    if data.get("response"):
+        # token context dizisi büyük ve tekrar kullanılmıyor; cache'e yazılmaz
         try:
-            result = call_ollama(model, prompt)
-            result.setdefault("used_model", model)
-            return result
-        except Exception as e:
-            last_exc = e
-            logger.warning(f"Model '{model}' ile başarısız: {e}")
-    raise RuntimeError(f"Hiçbir model başarılı olamadı. Son hata: {last_exc}")
+            cache.put(model, prompt, {k: v for k, v in data.items() if k != "context"}, bypass=bypass_cache)
+        except OSError as e:
+            # yanıt alındı; cache yazma hatası model hatası sayılıp devre kesiciye yansımaz
+            logger.warning(f"⚠️ Cache'e yazılamadı (model={model}): {e}")
+    return data
+
+
+def try_with_fallbacks(primary: str, prompt: str, bypass_cache: bool = False) -> dict:
+    order = [primary] + FALLBACK_CHAINS.get(primary, [])
+    try:
+        result, model = call_with_fallbacks(
+            OLLAMA_URL, order, lambda m: call_ollama(m, prompt, bypass_cache=bypass_cache),
+            attempts=RETRY_ATTEMPTS, log=logger,
+        )
+    except ModelsUnavailableError as e:
+        raise RuntimeError(f"Hiçbir model başarılı olamadı. Son hata: {e.last_error or e}") from e
+    result.setdefault("used_model", model)
+    return result
 
 
 def validate_and_annotate_schema(full_text: str) -> str:
-    schema_pattern = re.compile(r"(### Firestore Schema ###\s*)(\{.*?\})(?=###|$)", re.DOTALL)
-    def replacer(match):
-        prefix = match.group(1)
-        body = match.group(2)
+    """Firestore Schema bölümlerindeki JSON'u yerinde güzelleştirir; geçersizse uyarı ekler."""
+    parts = []
+    last = 0
+    for section in parse_sections(full_text):
+        body = section.schema_json() if section.kind == "schema" else None
+        if body is None:
+            continue
+        # gövdenin ham metindeki yeri (baştaki boşluklar korunur)
+        body_start = full_text.index(body, section.start)
+        body_end = body_start + len(body)
         try:
             parsed = json.loads(body)
-            pretty = json.dumps(parsed, indent=2, ensure_ascii=False)
-            return f"{prefix}{pretty}"
+            replacement = json.dumps(parsed, indent=2, ensure_ascii=False)
         except Exception:
-            warning = "\n// WARNING: Şema JSON geçerli değil veya parse edilemedi.\n"
-            return f"{prefix}{body}{warning}"
-    return schema_pattern.sub(replacer, full_text)
+            replacement = body + "\n// WARNING: Şema JSON geçerli değil veya parse edilemedi.\n"
+        parts.append(full_text[last:body_start])
+        parts.append(replacement)
+        last = body_end
+    parts.append(full_text[last:])
+    return "".join(parts)
 
 
 def atomic_write(path: Path, data: str):
@@ -157,6 +172,7 @@ def main():
         required=False,
         help="Optional override of model to use instead of inferring from sprint line (e.g., llama3:latest, mistral:latest, deepseek-coder:latest)",
     )
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the on-disk LLM response cache")
     args = parser.parse_args()
     sprint_line = args.sprint_line.strip()
 
@@ -169,7 +185,7 @@ def main():
     prompt = build_prompt(sprint_line)
 
     try:
-        response_json = try_with_fallbacks(model_choice, prompt)
+        response_json = try_with_fallbacks(model_choice, prompt, bypass_cache=args.no_cache)
         text = response_json.get("response", "")
         used_model = response_json.get("used_model", model_choice)
     except Exception as e:
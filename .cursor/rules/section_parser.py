@@ -0,0 +1,104 @@
+"""
+LLM çıktıları için ortak, tek geçişli "### Bölüm ###" ayrıştırıcısı.
+
+agent_auto.parse_and_export(), agent_auto.StreamingSectionExporter,
+scripts/consume_sprint_output.py ve goose_sprint_bridge.validate_and_annotate_schema()
+bu modülü kullanır. Metin bir kez soldan sağa taranır; her başlık kendi türüyle
+(widget, schema, ai_summary, pdf_export, prompt) Section olarak döner.
+Bölüm gövdesi, eski regex'lerle aynı kuralla bir sonraki "###" görülünce (veya metin
+sonunda) kapanır. SectionParser.feed() akıştan gelen parçaları artımlı işler.
+"""
+
+import re
+
+# başlık -> tür
+SECTION_KINDS = {
+    "Flutter Widget": "widget",
+    "Firestore Schema": "schema",
+    "AI Summary Prompt": "ai_summary",
+    "PDF Export Instructions": "pdf_export",
+    "Prompt 📋": "prompt",
+}
+
+MARKER = "###"
+HEADER_RE = re.compile(r"### (.+?) ###")
+CODE_FENCE_START_RE = re.compile(r"^```(?:dart)?\n?")
+CODE_FENCE_END_RE = re.compile(r"```$")
+
+
+class Section:
+    __slots__ = ("title", "kind", "body", "start", "end")
+
+    def __init__(self, title: str, body: str, start: int, end: int):
+        self.title = title
+        self.kind = SECTION_KINDS.get(title)
+        # başlık ve kapanış arasındaki boşluklar atılmış gövde
+        self.body = body.strip()
+        # ham metinde gövdenin (boşluklar dahil) konumu
+        self.start = start
+        self.end = end
+
+    def __repr__(self):
+        return f"Section({self.title!r}, {len(self.body)} karakter)"
+
+    def schema_json(self) -> str | None:
+        """Gövde bir JSON nesnesi gibi görünüyorsa ({ ... }) onu, değilse None döner."""
+        if self.body.startswith("{") and self.body.endswith("}"):
+            return self.body
+        return None
+
+    def code(self) -> str:
+        """```dart çitleri temizlenmiş kod."""
+        code = CODE_FENCE_START_RE.sub("", self.body)
+        return CODE_FENCE_END_RE.sub("", code)
+
+
+class SectionParser:
+    """Artımlı ayrıştırıcı: feed() o ana kadar kapanan bölümleri, finish() son açık bölümü döner."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.open_section = None  # (başlık, gövde başlangıcı)
+
+    def feed(self, chunk: str) -> list[Section]:
+        self.buffer += chunk
+        done = []
+        while True:
+            marker = self.buffer.find(MARKER, self.pos)
+            if marker == -1:
+                # son iki karakter yarım bir ### olabilir, tekrar taranır
+                self.pos = max(self.pos, len(self.buffer) - (len(MARKER) - 1))
+                if self.open_section is not None:
+                    self.pos = max(self.pos, self.open_section[1])
+                return done
+            if self.open_section is not None:
+                # açık bölüm bir sonraki ### ile kapanır
+                title, body_start = self.open_section
+                done.append(Section(title, self.buffer[body_start:marker], body_start, marker))
+                self.open_section = None
+            m = HEADER_RE.match(self.buffer, marker)
+            if m is None:
+                if "\n" not in self.buffer[marker:]:
+                    # başlık satırı henüz tamamlanmamış olabilir
+                    self.pos = marker
+                    return done
+                self.pos = marker + len(MARKER)
+                continue
+            self.open_section = (m.group(1), m.end())
+            self.pos = m.end()
+
+    def finish(self) -> list[Section]:
+        # akış bitti: açık kalan bölüm metin sonuyla kapanır
+        if self.open_section is None:
+            return []
+        title, body_start = self.open_section
+        self.open_section = None
+        self.pos = len(self.buffer)
+        return [Section(title, self.buffer[body_start:], body_start, len(self.buffer))]
+
+
+def parse_sections(text: str) -> list[Section]:
+    parser = SectionParser()
+    return parser.feed(text) + parser.finish()
+
@@ -0,0 +1,100 @@
+"""
+Seans özetleri için şifreli cache (scripts/functions/session_summary.py).
+
+Aynı seans notları aynı model ve prompt sürümüyle tekrar gönderildiğinde (düzenleme
+sonrası yeniden dışa aktarma, toplu export tekrarı) Ollama'ya gidilmez.
+- llm_cache.LLMCache üzerine kurulu: boyut sınırı (LRU, mtime ile) ve TTL aynı şekilde
+- klinik veri olduğu için kayıtlar diskte Fernet (AES-CBC + HMAC) ile şifrelenir
+- dosya adı notların düz hash'i değil, gizli anahtarla HMAC'idir; anahtar olmadan
+  "bu notlar cache'te mi" sorusu da yanıtlanamaz
+- anahtar SUMMARY_CACHE_KEY'den (Fernet.generate_key() çıktısı) okunur; yoksa
+  SUMMARY_CACHE_KEY_FILE oluşturulup (0600) kullanılır
+- anahtar değişirse eski kayıtlar çözülemez ve ıskalama sayılır
+"""
+
+import os
+import hmac
+import json
+import base64
+import hashlib
+import threading
+from pathlib import Path
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from llm_cache import LLMCache
+
+LOGS_DIR = Path(__file__).resolve().parent / "logs"
+CACHE_DIR = os.environ.get("SUMMARY_CACHE_DIR", str(LOGS_DIR / "summary_cache"))
+CACHE_MAX_BYTES = int(float(os.environ.get("SUMMARY_CACHE_MAX_MB", "64")) * 1024 * 1024)
+CACHE_TTL_SECONDS = int(os.environ.get("SUMMARY_CACHE_TTL", str(30 * 24 * 3600)))
+CACHE_DISABLED = os.environ.get("SUMMARY_CACHE_DISABLE", "0") == "1"
+KEY_FILE = os.environ.get("SUMMARY_CACHE_KEY_FILE", str(LOGS_DIR / "summary_cache.key"))
+
+
+def load_key(key_file: str = KEY_FILE) -> bytes:
+    """Ortamdaki anahtar, yoksa anahtar dosyası (ilk çalıştırmada üretilir)."""
+    key = os.environ.get("SUMMARY_CACHE_KEY")
+    if key:
+        return key.encode("ascii")
+    try:
+        with open(key_file, "rb") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(os.path.abspath(key_file)), exist_ok=True)
+    key = Fernet.generate_key()
+    try:
+        # O_EXCL: aynı anda başlayan iki süreç farklı anahtar yazmasın
+        fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        with open(key_file, "rb") as f:
+            return f.read().strip()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+class SummaryCache(LLMCache):
+    SUFFIX = ".enc"
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES,
+                 ttl: int = CACHE_TTL_SECONDS, disabled: bool = CACHE_DISABLED, key: bytes | None = None):
+        super().__init__(directory, max_bytes, ttl, disabled)
+        # devre dışıysa kalıcı anahtar dosyası üretilmez
+        key = key or (Fernet.generate_key() if disabled else load_key())
+        self._fernet = Fernet(key)
+        # dosya adları için ayrı alt anahtar (şifreleme anahtarı doğrudan HMAC'te kullanılmaz)
+        self._name_key = hashlib.sha256(b"summary-cache-name:" + base64.urlsafe_b64decode(key)).digest()
+
+    def _key(self, model: str, prompt: str, options: dict | None) -> str:
+        material = json.dumps(
+            {"model": model, "prompt": prompt, "options": options or {}},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hmac.new(self._name_key, material.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def _encode(self, entry: dict) -> bytes:
+        return self._fernet.encrypt(super()._encode(entry))
+
+    def _decode(self, data: bytes) -> dict:
+        try:
+            return super()._decode(self._fernet.decrypt(data))
+        except InvalidToken:
+            # bozuk kayıt veya değişmiş anahtar: ıskalama
+            raise ValueError("summary cache kaydı çözülemedi")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_summary_cache() -> SummaryCache:
+    """Süreç-genel paylaşılan özet cache'i (ilk çağrıda oluşturulur)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SummaryCache()
+    return _cache
@@ -0,0 +1,223 @@
+"""
+Kalıcı seans özeti işleri (SQLite) - scripts/functions/session_summary.py için.
+
+POST isteği işi "queued" olarak kaydedip hemen iş kimliğini döner; worker havuzu
+özetleme + PDF üretimini arka planda yapar (running → done / failed).
+Sunucu yeniden başladığında bekleyen işler ve sahibi ölmüş süreçte "running"
+kalmış işler yeniden kuyruğa alınır. İş bitince seans notları tablodan silinir;
+klinik metin yalnızca iş çalışmayı beklerken saklanır.
+- request ve summary sütunları özet cache'iyle aynı Fernet anahtarıyla şifrelenir
+  (summary_cache.load_key); veritabanı dosyası tek başına okunamaz
+- biten (done / failed) işler SESSION_JOBS_TTL saniye sonra PDF'leriyle birlikte silinir
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from summary_cache import load_key
+
+logger = logging.getLogger("summary_jobs")
+
+JOBS_DB = os.environ.get("SESSION_JOBS_DB", str(Path(__file__).resolve().parent / "logs" / "session_jobs.db"))
+JOB_WORKERS = int(os.environ.get("SESSION_JOB_WORKERS", "2"))
+JOBS_TTL_SECONDS = int(os.environ.get("SESSION_JOBS_TTL", str(7 * 24 * 3600)))
+PURGE_INTERVAL = 600
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    request TEXT,
+    summary TEXT,
+    pdf_path TEXT,
+    error TEXT,
+    owner INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def _pid_alive(pid: int | None) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobStore:
+    def __init__(self, db_path: str = JOBS_DB, key: bytes | None = None, ttl: int = JOBS_TTL_SECONDS):
+        self.db_path = db_path
+        self.ttl = ttl
+        self._fernet = Fernet(key or load_key())
+        self._last_purge = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(SCHEMA)
+
+    def _execute(self, sql: str, params=()):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def _seal(self, text: str) -> str:
+        return self._fernet.encrypt(text.encode("utf-8")).decode("ascii")
+
+    def _open(self, token: str) -> str:
+        try:
+            return self._fernet.decrypt(token.encode("ascii")).decode("utf-8")
+        except InvalidToken:
+            # değişmiş anahtar veya şifrelemeden önce yazılmış kayıt
+            raise ValueError("iş kaydı çözülemedi")
+
+    def create(self, request: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, status, request, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, STATUS_QUEUED, self._seal(json.dumps(request, ensure_ascii=False)), now, now),
+        )
+        self._maybe_purge()
+        return job_id
+
+    def get(self, job_id: str) -> sqlite3.Row | None:
+        return self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def summary(self, row: sqlite3.Row) -> str | None:
+        """Bitmiş işin (çözülmüş) özet metni."""
+        return self._open(row["summary"]) if row["summary"] else None
+
+    def claim(self, job_id: str) -> dict | None:
+        """queued → running; başka süreç/thread almışsa None, aldıysa istek gövdesi.
+
+        Kayıt çözülemezse iş running olarak alınmış kalır ve ValueError yükselir.
+        """
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (STATUS_RUNNING, os.getpid(), time.time(), job_id, STATUS_QUEUED),
+            )
+            if cur.rowcount != 1:
+                return None
+            row = self._conn.execute("SELECT request FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(self._open(row["request"])) if row["request"] else {}
+
+    def mark_done(self, job_id: str, summary: str, pdf_path: str):
+        self._execute(
+            "UPDATE jobs SET status = ?, summary = ?, pdf_path = ?, request = NULL, updated_at = ? WHERE id = ?",
+            (STATUS_DONE, self._seal(summary), pdf_path, time.time(), job_id),
+        )
+
+    def mark_failed(self, job_id: str, error: str):
+        self._execute(
+            "UPDATE jobs SET status = ?, error = ?, request = NULL, updated_at = ? WHERE id = ?",
+            (STATUS_FAILED, error, time.time(), job_id),
+        )
+
+    def recover(self) -> list[str]:
+        """Sahibi ölmüş running işleri queued'a çeker; çalıştırılacak tüm queued işleri döner."""
+        with self._lock, self._conn:
+            rows = self._conn.execute("SELECT id, owner FROM jobs WHERE status = ?", (STATUS_RUNNING,)).fetchall()
+            for row in rows:
+                if not _pid_alive(row["owner"]):
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? WHERE id = ? AND status = ?",
+                        (STATUS_QUEUED, time.time(), row["id"], STATUS_RUNNING),
+                    )
+            queued = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (STATUS_QUEUED,)
+            ).fetchall()
+        return [row["id"] for row in queued]
+
+    def purge(self) -> int:
+        """TTL'i dolmuş done / failed işleri ve PDF'lerini siler; silinen iş sayısını döner."""
+        cutoff = time.time() - self.ttl
+        with self._lock, self._conn:
+            self._last_purge = time.time()
+            rows = self._conn.execute(
+                "SELECT id, pdf_path FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (STATUS_DONE, STATUS_FAILED, cutoff),
+            ).fetchall()
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(row["id"],) for row in rows])
+        for row in rows:
+            if row["pdf_path"]:
+                try:
+                    os.remove(row["pdf_path"])
+                except OSError:
+                    pass
+        if rows:
+            logger.info(f"🧹 {len(rows)} süresi dolmuş özet işi silindi")
+        return len(rows)
+
+    def _maybe_purge(self):
+        if self.ttl > 0 and time.time() - self._last_purge >= PURGE_INTERVAL:
+            self.purge()
+
+    def counts(self) -> dict:
+        rows = self._execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def close(self):
+        self._conn.close()
+
+
+class JobRunner:
+    """İşleri bir thread havuzunda çalıştırır; work(request) -> (summary, pdf_path)."""
+
+    def __init__(self, store: JobStore, work, workers: int = JOB_WORKERS):
+        self.store = store
+        self.work = work
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="summary_job")
+
+    def submit(self, request: dict) -> str:
+        job_id = self.store.create(request)
+        self._pool.submit(self._run, job_id)
+        return job_id
+
+    def resume(self) -> int:
+        if self.store.ttl > 0:
+            self.store.purge()
+        job_ids = self.store.recover()
+        for job_id in job_ids:
+            self._pool.submit(self._run, job_id)
+        if job_ids:
+            logger.info(f"🔁 {len(job_ids)} bekleyen özet işi yeniden kuyruğa alındı")
+        return len(job_ids)
+
+    def _run(self, job_id: str):
+        try:
+            request = self.store.claim(job_id)
+            if request is None:
+                return
+            summary, pdf_path = self.work(request)
+        except Exception as e:
+            logger.error(f"❌ Özet işi başarısız ({job_id}): {e}")
+            self.store.mark_failed(job_id, str(e))
+            return
+        self.store.mark_done(job_id, summary, pdf_path)
+
+    def shutdown(self, wait: bool = True):
+        # bekleyen işler queued olarak kalır, bir sonraki başlangıçta resume() ile devam eder
+        self._pool.shutdown(wait=wait, cancel_futures=True)
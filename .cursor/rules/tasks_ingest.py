@@ -0,0 +1,103 @@
+"""
+tasks.txt için artımlı okuyucu (agent_auto.py).
+
+Her kayıtta tüm dosyayı okuyup her satırı yeniden hash'lemek yerine:
+- son işlenen bayt konumu (offset) ve inode saklanır; dosya yalnızca uzadıysa sadece eklenen kısım okunur
+- offset'ten önceki son birkaç KB (anchor) karşılaştırılarak önceki içeriğin değişmediği doğrulanır
+- dosya kısaldıysa (truncate), anchor tutmuyorsa (yerinde düzenleme) veya dosya başka biriyle
+  değiştirildiyse (rotate / editörün rename ile kaydetmesi) baştan okunur; satır parmak izleri
+  sayesinde yalnızca yeni veya değişmiş satırlar döner
+- parmak izi kümesi baştan okumada dosyanın güncel satırlarından yeniden kurulur; süreç
+  ömrü boyunca büyümez, dosyadaki satır sayısıyla sınırlıdır
+Sonu satır sonu ile bitmeyen son satır (yarım kaydedilmiş düzenleme) bekletilir: offset'e
+dahil edilmez, satır sonu gelince tamamlanmış haliyle döner. read_new(final=True) (ör.
+başlangıç taraması) onu hemen döndürür; tamamlandığında içeriği aynıysa tekrar dönmez.
+
+Sınır: aynı inode üzerinde (yerinde yazan editör) dosya boyu ve anchor penceresi değişmeden
+yalnızca anchor'dan önceki bir satır düzenlenirse bu fark edilmez. Geçici dosya + rename ile
+kaydeden editörler inode değiştirdiği için her durumda baştan okunur.
+"""
+
+import os
+import hashlib
+
+ANCHOR_BYTES = 4096
+
+
+def _fingerprint(raw: bytes) -> bytes:
+    return hashlib.blake2b(raw.strip().lower(), digest_size=8).digest()
+
+
+class IncrementalLineReader:
+    def __init__(self, path: str, anchor_bytes: int = ANCHOR_BYTES):
+        self.path = path
+        self.anchor_bytes = anchor_bytes
+        self.inode = None
+        self.offset = 0
+        self.line_no = 0
+        self.anchor = b""
+        self.seen = set()
+        # son okumanın türü: "append" (yalnızca yeni baytlar) veya "rescan" (baştan)
+        self.last_mode = None
+        self.rescans = 0
+
+    def _can_resume(self, f, inode, size: int) -> bool:
+        if self.inode is not None and inode != self.inode:
+            # rotate / rename ile kaydetme: eski offset başka bir dosyaya ait
+            return False
+        if size < self.offset:
+            return False
+        if not self.anchor:
+            return self.offset == 0
+        f.seek(self.offset - len(self.anchor))
+        return f.read(len(self.anchor)) == self.anchor
+
+    def read_new(self, final: bool = False) -> list[tuple[int, str]]:
+        """Son çağrıdan bu yana eklenen/değişen satırları (satır no, metin) olarak döner.
+
+        final=False iken sonlandırılmamış son satır döndürülmez (yazım sürüyor olabilir).
+        """
+        try:
+            st = os.stat(self.path)
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return []
+        with f:
+            inode = (st.st_dev, st.st_ino)
+            if self._can_resume(f, inode, st.st_size):
+                self.last_mode = "append"
+                f.seek(self.offset)
+                base_offset, base_line, anchor = self.offset, self.line_no, self.anchor
+            else:
+                self.last_mode = "rescan"
+                self.rescans += 1
+                f.seek(0)
+                base_offset, base_line, anchor = 0, 0, b""
+            data = f.read()
+        self.inode = inode
+
+        end = data.rfind(b"\n") + 1
+        complete, tail = data[:end], data[end:]
+        new = []
+        # baştan okumada küme dosyanın şu anki satırlarından yeniden kurulur (silinenler düşer)
+        seen = self.seen if self.last_mode == "append" else set()
+        lines = complete.split(b"\n")[:-1]
+        for i, raw in enumerate(lines, 1):
+            fp = _fingerprint(raw)
+            if fp not in self.seen and fp not in seen:
+                new.append((base_line + i, raw.decode("utf-8", errors="replace").rstrip("\r")))
+            seen.add(fp)
+        self.offset = base_offset + len(complete)
+        self.line_no = base_line + len(lines)
+        self.anchor = (anchor + complete)[-self.anchor_bytes:]
+
+        if tail.strip():
+            fp = _fingerprint(tail)
+            if fp in self.seen:
+                # önceden (final ile) döndürülmüş yarım satır: tamamlandığında tekrar dönmesin
+                seen.add(fp)
+            elif final:
+                seen.add(fp)
+                new.append((self.line_no + 1, tail.decode("utf-8", errors="replace").rstrip("\r")))
+        self.seen = seen
+        return new
@@ -8,10 +8,10 @@ export LC_CTYPE=en_US.UTF-8
 
 echo "🚀 Smoke Test Başlıyor..."
 
-# 1) üret → filtrele
+# 1) üret (fix_filter FSM içinde, aynı süreçte uygulanır) → test edilmiş kodu hedefe yaz
 echo "📝 AI'dan kod üretiliyor..."
-python3 .cursor/rules/fsm_runner.py <<'PROMPT' \
- | python3 .cursor/rules/fix_filter.py > lib/widgets/hello_box.dart
+rm -f lib/widgets/hello_box.dart
+if ! python3 .cursor/rules/fsm_runner.py --out lib/widgets/hello_box.dart <<'PROMPT'
 HEDEF DOSYA: lib/widgets/hello_box.dart
 GÖREV: Bu dosya için TAM içeriği üret.
 BİÇİM: SADECE DART KODU, AÇIKLAMA YOK, KOD BLOĞU İŞARETİ YOK.
@@ -22,13 +22,18 @@ GEREKSİNİMLER:
 
 ŞİMDİ SADECE DART DOSYASI İÇERİĞİNİ YAZ.
 PROMPT
+then
+  echo "⚠️ FSM başarısız oldu, kod üretilemedi"
+fi
 
 # 2) format → analyze
-echo "🔧 Kod formatlanıyor..."
-dart format lib/widgets/hello_box.dart
+if [ -f lib/widgets/hello_box.dart ]; then
+  echo "🔧 Kod formatlanıyor..."
+  dart format lib/widgets/hello_box.dart
+fi
 
 echo "✅ Kod analiz ediliyor..."
-if ! dart analyze lib/widgets/hello_box.dart; then
+if [ ! -f lib/widgets/hello_box.dart ] || ! dart analyze lib/widgets/hello_box.dart; then
   echo "❌ AI kodu hatalı, fallback widget kullanılıyor..."
   # 3) fallback
   printf "%s\n" "import 'package:flutter/material.dart';